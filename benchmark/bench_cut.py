@@ -0,0 +1,101 @@
+import os
+import sys
+import tempfile
+from collections import deque
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from application import Cut  # noqa: E402
+from file_handling import iter_file  # noqa: E402
+
+NUM_LINES = 1000000
+SPECS = ["1-20,40-", "1,5,9,13", "5-"]
+FIELD_SPECS = ["2", "1,3", "5-"]
+
+
+# Cut as it was: the list expanded into a list of indices, and each line
+# built a character at a time. It only handles single-digit indices, so
+# the bytes are picked here from the expanded ranges.
+def old_cut(spec, file):
+    indices = set()
+    open_start = None
+    for part in spec.split(","):
+        first, dash, last = part.partition("-")
+        start = int(first) - 1 if first else 0
+        if dash and not last:
+            open_start = start
+            continue
+        indices.update(range(start, int(last) if last else start + 1))
+    indices = sorted(i for i in indices
+                     if open_start is None or i < open_start)
+    for line in iter_file(file):
+        new_line = ""
+        for j in indices:
+            if j < len(line) - 1:
+                new_line += line[j]
+        if open_start is not None:
+            new_line += line[open_start:len(line)]
+            yield new_line
+        else:
+            yield new_line + "\n"
+
+
+def new_cut(spec, file):
+    return Cut().stream(["-b", spec, file])
+
+
+# Field cut splitting the whole line, against cut -f, which splits only as
+# far as the last field wanted.
+def full_split_cut(spec, file):
+    cut = Cut()
+    slices = cut.ranges(spec)
+    for line in iter_file(file):
+        fields = line[:-1].split(" ")
+        yield " ".join(f for s in slices for f in fields[s]) + "\n"
+
+
+def field_cut(spec, file):
+    return Cut().stream(["-d", " ", "-f", spec, file])
+
+
+def best_time(cut, spec, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        deque(cut(spec, "big.txt"), maxlen=0)
+        times.append(perf_counter() - start)
+    return min(times)
+
+
+# Lines per second of the old and new cut -b over a 1M-line file, read once
+# first so that both read it from the file cache, then of cut -f against
+# splitting whole lines.
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        with open("big.txt", "w") as f:
+            for i in range(NUM_LINES):
+                f.write(f"line {i:>7} of the input to the cut benchmark\n")
+        deque(iter_file("big.txt"), maxlen=0)
+
+        print(f"{'list':<12}{'old lines/s':>14}{'new lines/s':>14}"
+              f"{'speedup':>10}")
+        for spec in SPECS:
+            old = best_time(old_cut, spec)
+            new = best_time(new_cut, spec)
+            print(f"{spec:<12}{NUM_LINES / old:>14,.0f}"
+                  f"{NUM_LINES / new:>14,.0f}{old / new:>9.1f}x")
+
+        print()
+        print(f"{'fields':<12}{'full split/s':>14}{'cut -f/s':>14}"
+              f"{'speedup':>10}")
+        for spec in FIELD_SPECS:
+            full = best_time(full_split_cut, spec)
+            bounded = best_time(field_cut, spec)
+            print(f"{spec:<12}{NUM_LINES / full:>14,.0f}"
+                  f"{NUM_LINES / bounded:>14,.0f}{full / bounded:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import os
+import sys
+import tempfile
+from collections import deque
+from fnmatch import fnmatch
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from application import Find, set_find_workers  # noqa: E402
+from find_index import build_index, set_index_directory  # noqa: E402
+
+# A tree of FANOUT ** DEPTH directories with FILES_PER_DIR files each.
+FANOUT = 8
+DEPTH = 4
+FILES_PER_DIR = 20
+PATTERN = "*.py"
+
+
+def make_tree(root, depth):
+    for i in range(FILES_PER_DIR):
+        extension = ".py" if i % 4 == 0 else ".txt"
+        open(os.path.join(root, f"file{i}{extension}"), "w").close()
+    if depth > 0:
+        for i in range(FANOUT):
+            directory = os.path.join(root, f"dir{i}")
+            os.mkdir(directory)
+            make_tree(directory, depth - 1)
+
+
+# Find as it was: os.walk() and fnmatch() for every file.
+def old_find(pattern):
+    for root, dirs, files in os.walk("."):
+        for name in files:
+            if fnmatch(name, pattern):
+                yield os.path.join(root, name) + "\n"
+
+
+def new_find(pattern):
+    return Find().stream(["-name", pattern])
+
+
+# Set the mtimes of the directories back, as if the tree had been built
+# long before it was indexed. Directories changed just before they are
+# indexed are scanned again by every query.
+def age_directories():
+    for root, dirs, _ in os.walk("."):
+        for directory in [root] + [os.path.join(root, d) for d in dirs]:
+            os.utime(directory, (1, 1))
+
+
+def best_time(find, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        deque(find(PATTERN), maxlen=0)
+        times.append(perf_counter() - start)
+    return min(times)
+
+
+# Time of finding the files matching PATTERN in a generated tree, with the
+# old walker and with the scandir walker on different numbers of threads.
+# The tree is walked once first, so the directories are in the OS cache.
+# Then the time of building an index of the tree, and of queries answered
+# from it, with no directories changed and with one changed.
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        os.mkdir("tree")
+        os.chdir("tree")
+        make_tree(".", DEPTH)
+        age_directories()
+        files = sum(len(files) for _, _, files in os.walk("."))
+        print(f"find -name {PATTERN!r}, {files} files")
+        print(f"{'walker':<20}{'time':>12}{'speedup':>10}")
+        old = best_time(old_find)
+        print(f"{'os.walk':<20}{old * 1e3:>10.1f}ms")
+        for workers in sorted({1, 4, os.cpu_count() or 1}):
+            set_find_workers(workers)
+            new = best_time(new_find)
+            name = f"scandir {workers} thr"
+            print(f"{name:<20}{new * 1e3:>10.1f}ms{old / new:>9.1f}x")
+
+        set_index_directory(os.path.join(directory, "index"))
+        start = perf_counter()
+        build_index(".")
+        print()
+        print(f"{'index':<20}{(perf_counter() - start) * 1e3:>10.1f}ms")
+        warm = best_time(new_find)
+        print(f"{'warm, no changes':<20}{warm * 1e3:>10.1f}ms"
+              f"{old / warm:>9.1f}x")
+        open(os.path.join("dir0", "new.py"), "w").close()
+        start = perf_counter()
+        deque(new_find(PATTERN), maxlen=0)
+        changed = perf_counter() - start
+        print(f"{'warm, one changed':<20}{changed * 1e3:>10.1f}ms"
+              f"{old / changed:>9.1f}x")
+        os.chdir(directory)
+
+
+if __name__ == "__main__":
+    main()
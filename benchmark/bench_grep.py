@@ -0,0 +1,105 @@
+import os
+import re
+import sys
+import tempfile
+from collections import deque
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from application import Grep, set_grep_workers, \
+    set_grep_parallel_size  # noqa: E402
+from file_handling import iter_file  # noqa: E402
+
+NUM_LINES = 1000000
+NUM_FILES = 8
+PATTERNS = ["line 99", "line 9.*9 of", "[a-z]+ 12"]
+
+# Patterns matching few and almost all of the lines.
+SPARSE_DENSE = [("sparse", "line 99999 "), ("sparse", "line 12345.? of"),
+                ("dense", "line"), ("dense", "[a-z]+ [0-9]+")]
+
+
+# Grep as it was: re.match() with the pattern string and a TTY check for
+# every matching line.
+def old_grep(pattern, file):
+    for line in iter_file(file):
+        if re.match(pattern, line):
+            if sys.stdout.isatty():
+                yield line
+            else:
+                yield line
+
+
+def new_grep(pattern, file):
+    return Grep().stream([pattern, file])
+
+
+# Grep matching a line at a time, without the whole-file scan.
+def line_grep(pattern, file):
+    return filter(Grep().matcher(pattern), iter_file(file))
+
+
+def whole_file_grep(pattern, file):
+    grep = Grep()
+    return grep.match_file(file, pattern, grep.matcher(pattern))
+
+
+def multi_file_grep(files, file):
+    return Grep().stream(["line 9.*9 of"] + files)
+
+
+def best_time(grep, pattern, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        deque(grep(pattern, "big.txt"), maxlen=0)
+        times.append(perf_counter() - start)
+    return min(times)
+
+
+# Lines per second of the old and new grep over a 1M-line file, then the
+# time of matching a line at a time against scanning the whole file for
+# sparse and dense matches. The file is read once first, so the line
+# iterators read it from the file cache. Last, the time of searching
+# several files with different numbers of workers.
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        with open("big.txt", "w") as f:
+            for i in range(NUM_LINES):
+                f.write(f"line {i} of the benchmark input\n")
+        deque(iter_file("big.txt"), maxlen=0)
+
+        print(f"{'pattern':<16}{'old lines/s':>14}{'new lines/s':>14}"
+              f"{'speedup':>10}")
+        for pattern in PATTERNS:
+            old = best_time(old_grep, pattern)
+            new = best_time(new_grep, pattern)
+            print(f"{pattern:<16}{NUM_LINES / old:>14,.0f}"
+                  f"{NUM_LINES / new:>14,.0f}{old / new:>9.1f}x")
+
+        print()
+        print(f"{'input':<8}{'pattern':<18}{'by line':>12}{'whole file':>12}"
+              f"{'speedup':>10}")
+        for name, pattern in SPARSE_DENSE:
+            by_line = best_time(line_grep, pattern)
+            whole = best_time(whole_file_grep, pattern)
+            print(f"{name:<8}{pattern:<18}{by_line * 1e3:>10.1f}ms"
+                  f"{whole * 1e3:>10.1f}ms{by_line / whole:>9.1f}x")
+
+        # The same file searched several times, one file at a time and in
+        # the process pool.
+        files = ["big.txt"] * NUM_FILES
+        print()
+        print(f"{NUM_FILES} files")
+        print(f"{'workers':<8}{'time':>12}")
+        set_grep_parallel_size(0)
+        for workers in sorted({1, os.cpu_count() or 1, 4}):
+            set_grep_workers(workers)
+            time = best_time(multi_file_grep, files)
+            print(f"{workers:<8}{time * 1e3:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import os
+import sys
+import tempfile
+from collections import deque
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from converter import Converter  # noqa: E402
+from file_handling import set_file_cache_size  # noqa: E402
+from parse import parse  # noqa: E402
+
+SIZES = [10 ** 4, 10 ** 5, 10 ** 6, 4 * 10 ** 6]
+
+
+def best_time(line, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        parse(line, deque(), Converter())
+        times.append(perf_counter() - start)
+    return min(times)
+
+
+# Time head -n 5 on files of growing size. Reading the whole file, as wc
+# does, is shown for comparison. The file cache is turned off so that every
+# run reads the file.
+def main():
+    set_file_cache_size(0)
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        print(f"{'lines':>10}{'MiB':>8}{'head -n 5':>14}{'wc':>14}")
+        for size in SIZES:
+            with open("big.txt", "w") as f:
+                for i in range(size):
+                    f.write(f"line {i} of the benchmark input\n")
+            mib = os.path.getsize("big.txt") / (1 << 20)
+            head = best_time("head -n 5 big.txt")
+            wc = best_time("wc big.txt", repeat=1)
+            print(f"{size:>10}{mib:>8.1f}{head * 1e3:>12.2f}ms"
+                  f"{wc * 1e3:>12.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import io
+import os
+import sys
+import tempfile
+from collections import deque
+from contextlib import redirect_stdout
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from converter import Converter  # noqa: E402
+from parse import parse  # noqa: E402
+from writer import OutputWriter  # noqa: E402
+
+NUM_LINES = 1000000
+FLUSH_SIZES = [1 << 12, 1 << 16, 1 << 20]
+
+
+# A binary stream to /dev/null that records when it was first written to.
+class TimedStream(io.RawIOBase):
+    def __init__(self):
+        self.devnull = open(os.devnull, "wb")
+        self.first_write = None
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if self.first_write is None:
+            self.first_write = perf_counter()
+        return self.devnull.write(data)
+
+
+# Collect the whole output in a deque and print it a line at a time.
+def print_lines(line, stream):
+    out = deque()
+    parse(line, out, Converter())
+    with redirect_stdout(io.TextIOWrapper(stream, write_through=True)):
+        while len(out) > 0:
+            print(out.popleft(), end="")
+
+
+def write_lines(line, stream, flush_size):
+    writer = OutputWriter(stream, flush_size)
+    parse(line, writer, Converter())
+    writer.flush()
+
+
+# Return the time to the first byte and the total time of writing out.
+def run(write, line, *args):
+    stream = TimedStream()
+    start = perf_counter()
+    write(line, stream, *args)
+    return stream.first_write - start, perf_counter() - start
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        with open("big.txt", "w") as f:
+            for i in range(NUM_LINES):
+                f.write(f"line {i} of the benchmark input\n")
+
+        line = "cat big.txt"
+        print(f"{line!r}, {NUM_LINES} lines")
+        print(f"{'writer':<24}{'first byte':>12}{'total':>12}")
+        first, total = run(print_lines, line)
+        print(f"{'print per line':<24}{first * 1e3:>10.1f}ms"
+              f"{total * 1e3:>10.1f}ms")
+        for flush_size in FLUSH_SIZES:
+            first, total = run(write_lines, line, flush_size)
+            name = f"OutputWriter {flush_size >> 10}KiB"
+            print(f"{name:<24}{first * 1e3:>10.1f}ms{total * 1e3:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import os
+import sys
+from timeit import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from converter import Converter  # noqa: E402
+from fast_parse import fast_convert  # noqa: E402
+from parse import convert  # noqa: E402
+
+LINES = [
+    "echo hello world",
+    "cat dir1/file1.txt dir1/file2.txt",
+    "cat dir1/file1.txt | grep AAA | sort -r | uniq",
+    "head -n 5 dir1/longfile.txt > out.txt; cat out.txt; rm out.txt",
+    "sort < dir1/file1.txt >> sorted.txt",
+]
+
+
+# Compare converting each line with the ANTLR parser and the fast path.
+def main(number=2000):
+    print(f"{'line':<66}{'antlr':>10}{'fast':>10}{'speedup':>9}")
+    for line in LINES:
+        antlr = timeit(lambda: convert(line, Converter()), number=number)
+        fast = timeit(lambda: fast_convert(line), number=number)
+        print(f"{line:<66}{antlr / number * 1e6:>8.1f}us"
+              f"{fast / number * 1e6:>8.1f}us{antlr / fast:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
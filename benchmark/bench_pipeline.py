@@ -0,0 +1,54 @@
+import os
+import sys
+import tempfile
+from collections import deque
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from command import PIPELINE_MODES, set_pipeline_mode  # noqa: E402
+from converter import Converter  # noqa: E402
+from parse import parse  # noqa: E402
+
+NUM_LINES = 200000
+
+PIPELINES = [
+    "cat big.txt | grep 'line 1' | cut -b 1-12",
+    "cat big.txt | cat | cat | cat",
+    "cat big.txt | sort -r | uniq | head -n 5",
+    "cat big.txt | grep '.*7' > out.txt",
+    "cat big.txt | grep '(.*[0-9]){3}.*9 of' | wc",
+]
+
+
+def make_input(directory):
+    with open(os.path.join(directory, "big.txt"), "w") as f:
+        for i in range(NUM_LINES):
+            f.write(f"line {i} of the benchmark input\n")
+
+
+def run(line):
+    start = perf_counter()
+    parse(line, deque(), Converter())
+    return perf_counter() - start
+
+
+# Time each pipeline in every pipeline mode. The best of three runs is kept,
+# so the start of the process pool is not counted.
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        make_input(directory)
+        print(f"{'pipeline':<46}" + "".join(f"{mode:>12}"
+                                            for mode in PIPELINE_MODES))
+        for line in PIPELINES:
+            times = []
+            for mode in PIPELINE_MODES:
+                set_pipeline_mode(mode)
+                times.append(min(run(line) for _ in range(3)))
+            print(f"{line:<46}" + "".join(f"{t * 1e3:>10.1f}ms"
+                                          for t in times))
+
+
+if __name__ == "__main__":
+    main()
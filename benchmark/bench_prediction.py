@@ -0,0 +1,45 @@
+import os
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from antlr4 import InputStream, CommonTokenStream  # noqa: E402
+from grammar.ShellLexer import ShellLexer  # noqa: E402
+from grammar.ShellParser import ShellParser  # noqa: E402
+from parse import parse_tree  # noqa: E402
+
+SIZES = [10, 100, 1000, 10000]
+
+
+# Parse with the runtime's default full LL prediction only.
+def parse_tree_ll(s):
+    parser = ShellParser(CommonTokenStream(ShellLexer(InputStream(s))))
+    return parser.command()
+
+
+def best_of(func, s, repeat):
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        func(s)
+        times.append(perf_counter() - start)
+    return min(times)
+
+
+# Time parsing lines of N sequenced and N piped calls in both modes.
+def main():
+    print(f"{'calls':>6}  {'operator':<9}{'LL':>10}{'SLL+LL':>10}"
+          f"{'speedup':>9}")
+    for n in SIZES:
+        repeat = 3 if n >= 1000 else 20
+        for name, separator in [("sequence", "; "), ("pipe", " | ")]:
+            line = separator.join(["echo hello world"] * n)
+            ll = best_of(parse_tree_ll, line, repeat)
+            two_stage = best_of(parse_tree, line, repeat)
+            print(f"{n:>6}  {name:<9}{ll * 1e3:>8.1f}ms"
+                  f"{two_stage * 1e3:>8.1f}ms{ll / two_stage:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
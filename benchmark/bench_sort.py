@@ -0,0 +1,50 @@
+import os
+import random
+import sys
+from collections import deque
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import sorting  # noqa: E402
+from pipeline import get_process_pool  # noqa: E402
+
+# Pass the largest size as the first argument, e.g. 10000000, and the
+# number of processes as the second. Ten million lines take a few GiB of
+# memory.
+MAX_LINES = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+WORKERS = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+SIZES = [10 ** k for k in range(4, 8) if 10 ** k <= MAX_LINES]
+
+
+def best_time(lines, workers, repeat=3):
+    sorting.set_sort_workers(workers)
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        deque(sorting.sort_lines(iter(lines)), maxlen=0)
+        times.append(perf_counter() - start)
+    return min(times)
+
+
+# Time sorting random lines in one process and in the process pool, with
+# the cutover threshold turned off so that every size is sorted in parallel.
+def main():
+    workers = WORKERS
+    sorting.PARALLEL_SORT_THRESHOLD = 0
+    sorting.set_sort_memory_size(1 << 40)
+    # Start the pool before timing.
+    get_process_pool().submit(sorting.sorted_chunk, [], False).result()
+
+    print(f"{'lines':>10}{'1 process':>14}{f'{workers} processes':>16}"
+          f"{'speedup':>10}")
+    for size in SIZES:
+        lines = [f"{random.random()} line {i}\n" for i in range(size)]
+        serial = best_time(lines, 1)
+        parallel = best_time(lines, workers)
+        print(f"{size:>10}{serial * 1e3:>12.1f}ms{parallel * 1e3:>14.1f}ms"
+              f"{serial / parallel:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
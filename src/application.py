@@ -1,361 +1,813 @@
-import re
-import os
-import sys
-from colorama import Fore
-from os import listdir
-from file_handling import open_file
-from fnmatch import fnmatch
-
-# Class interface for all applications
-
-
-class Application:
-    def __init__(self):
-        self.u = UtilityMethods()
-
-    def exec(self, args, output):
-        pass
-
-# Class of utility methods for applications:
-
-
-class UtilityMethods:
-
-    # If taking input from stdin,
-    # return the lines in the text file as a list.
-    def check_if_stdin_lines(self, args):
-        try:
-            os.path.isfile(args[0])
-        except TypeError:
-            return args[0]
-        else:
-            return open_file(args[0])
-
-    # If taking input from stdin,
-    # return the correct list of args.
-    def check_if_stdin_file(self, args):
-        try:
-            os.path.isfile(args[0])
-        except TypeError:
-            return args[0], True
-        else:
-            return args, False
-
-    # Template method for head and tail.
-    def head_tail_check_args(self, args):
-        num_lines = 10
-        if args[0] == '-n':
-            num_lines = int(args[1])
-            args = args[2:]
-        self.check_wrong_flag(args)
-        lines = self.check_if_stdin_lines(args)
-        return lines, num_lines
-
-    # Raise an error if invalid flags are used.
-    def check_wrong_flag(self, args, flags=True):
-        if args[0][0] == '-':
-            if flags:
-                raise ValueError("Wrong flag")
-            else:
-                raise ValueError("this application does not accept flags.")
-
-
-# Applications:
-
-
-# Changes current directory to the specified directory.
-class Cd(Application):
-    def exec(self, args, output):
-        os.chdir(args[0])
-
-
-# Prints the current directory.
-class Pwd(Application):
-    def exec(self, args, output):
-        output.append(os.getcwd())
-
-
-# Prints all arguments in output.
-class Echo(Application):
-    def exec(self, args, output):
-        for i in args:
-            output.append(i + " ")
-
-
-# Lists all the files in the specified directory.
-class Ls(Application):
-    def exec(self, args, output):
-        if len(args) == 0:
-            ls_dir = os.getcwd()
-        else:
-            ls_dir = args[0]
-        # Prevents hidden folders from being outputted by ls
-        for f in listdir(ls_dir):
-            if not f.startswith("."):
-                output.append(f + "\n")
-
-
-# Prints the contents of a file to output
-class Cat(Application):
-    def exec(self, args, output):
-        for a in args:
-            try:
-                lines = open_file(a)
-                output.extend(lines)
-            # Getting args from stdin instead.
-            except TypeError:
-                output.extend(args[0])
-
-
-# Gives first n number of lines from a text file
-class Head(Application):
-    def exec(self, args, output):
-        lines, num_lines = self.u.head_tail_check_args(args)
-
-        # If num_lines > the number of lines in the file,
-        # then output all lines.
-        for i in range(0, min(len(lines), num_lines)):
-            output.append(lines[i])
-
-
-# Gives first n number of lines from a text file
-class Tail(Application):
-    def exec(self, args, output):
-        lines, num_lines = self.u.head_tail_check_args(args)
-
-        # If num_lines > the number of lines in the file,
-        # then output all lines.
-        display_length = min(len(lines), num_lines)
-        for i in range(0, display_length):
-            output.append(lines[len(lines) - display_length + i])
-
-
-# Finds all instances of a pattern in a file and outputs them
-class Grep(Application):
-    def exec(self, args, output):
-        # Grep doesn't accept any flags
-        self.u.check_wrong_flag(args, False)
-
-        pattern = args.pop(0)
-        files, stdin = self.u.check_if_stdin_file(args)
-
-        for file in files:
-            if not stdin:
-                lines = open_file(file)
-                for line in lines:
-                    line = self.match_pattern(pattern, line)
-                    if len(files) > 1 and line:
-                        output.append(f"{file}:{line}")
-                    elif line:
-                        output.append(line)
-            else:
-                line = self.match_pattern(pattern, file)
-                if line:
-                    output.append(line)
-
-    def match_pattern(self, pattern, line):
-        if re.match(pattern, line):
-            # Highlight the pattern in each line in cyan except for
-            # when testing to avoid test failures.
-            if sys.stdout.isatty():
-                return self.highlight(pattern, line)
-            else:
-                return line
-
-    # Highlights the searched for substring when outputting to terminal
-    def highlight(self, pattern, line):
-        line = line.replace(pattern, Fore.LIGHTCYAN_EX + pattern + Fore.RESET)
-        return line
-
-
-# Outputs a file after removing duplicate lines
-class Uniq(Application):
-    def exec(self, args, output):
-        case = False
-        if args[0] == '-i':
-            args.pop(0)
-            case = True
-        self.u.check_wrong_flag(args)
-
-        lines = self.u.check_if_stdin_lines(args)
-
-        output.append(lines[0])
-        # Checks if last 2 searched lines are equal to remove duplicates.
-        for i in range(1, len(lines)):
-            if not self.compare(lines[i - 1], lines[i], case):
-                output.append(lines[i])
-
-    # Checks equality based on whether ignore case flag was used or not.
-    def compare(self, a, b, ignore):
-        if ignore:
-            if a.lower().strip() == b.lower().strip():
-                return True
-        elif not ignore:
-            if a.strip() == b.strip():
-                return True
-        else:
-            return False
-
-
-# Sort lines of text files in alphabetical or reversed order
-class Sort(Application):
-    def exec(self, args, output):
-        rev = False
-        if args[0] == '-r':
-            rev = True
-            args.pop(0)
-
-        self.u.check_wrong_flag(args)
-
-        lines = self.u.check_if_stdin_lines(args)
-
-        sorted_lines = sorted(lines, reverse=rev)
-        for line in sorted_lines:
-            output.append(line)
-
-
-# Removes section from each line in a file
-class Cut(Application):
-    def exec(self, args, output):
-        if args[0] == "-b":
-            args.pop(0)
-            self.cut_b(args, output)
-        else:
-            raise ValueError("Wrong flags")
-
-    def cut_b(self, args, out):
-        index = list(args[0])
-        args.pop(0)
-        n, index_list, open_i = self.find_range(index)
-
-        lines = self.u.check_if_stdin_lines(args)
-
-        for line in lines:
-            new_line = ""
-            for j in index_list:
-                if open_i and len(n) > 0:
-                    # Ensures characters are not repeated for open intervals.
-                    if j >= n[0] + 1:
-                        continue
-                else:
-                    new_line += line[j]
-            # If interval is open then, add all characters from n til the end.
-            if open_i:
-                new_line += line[n[0]: len(line)]
-                out.append(new_line)
-            else:
-                out.append(new_line + "\n")
-
-    # Returns a list of indices of characters that should be
-    # included of each line in the text file.
-    def find_range(self, arr):
-        index_list = []
-        prev = -1
-        open_i = False
-        neg = False
-        n = []
-        for i in arr:
-            peek = True
-            if i == "-":
-                if prev == -1:
-                    # If no number before, then this is a negative number.
-                    neg = True
-                else:
-                    # Otherwise, this is an open interval.
-                    n.append(prev)
-                    open_i = True
-            # If comma, then we start to look at another set of indices.
-            elif i == ",":
-                prev = -1
-                peek = False
-            # If neither a comma nor a dash, then it's a number.
-            elif i != "-" or i != ",":
-                # The interval is closed.
-                open_i = False
-                # if the index, n, is negative we want all the characters
-                # from 0 to n.
-                if neg:
-                    index_list.extend(range(0, int(i)))
-                    neg = False
-                # Set new value for the previous index in the list.
-                elif peek:
-                    if len(index_list) == 0:
-                        prev = int(i) - 1
-                    else:
-                        prev = index_list[-1]
-                else:
-                    prev = int(i) - 1
-                # Add all the numbers in the index interval.
-                index_list.extend(range(prev, int(i)))
-        # Remove any negative indices.
-        index_list = [i for i in index_list if i >= 0]
-        # Remove any repeated indices.
-        index_list = list(set(index_list))
-        return n, index_list, open_i
-
-
-# Finds all files that match a pattern in a specified path
-class Find(Application):
-    def exec(self, args, output):
-        # Sets default values for path and pattern if not provided
-        path = "." if args[0] == "-name" else args[0]
-        pattern = args[-1] if "-name" in args else "*"
-        # Walks through files recursively and outputs filenames that match
-        for root, dirs, files in os.walk(path, topdown=True):
-            for name in files:
-                if fnmatch(name, pattern):
-                    output.append(os.path.join(root, name) + "\n")
-
-
-# Checks if directory already exists and if not creates it
-class Mkdir(Application):
-    def exec(self, args, output):
-        self.u.check_wrong_flag(args, False)
-        args, stdin = self.u.check_if_stdin_file(args)
-
-        for dir in args:
-            if not os.path.isdir(dir.strip()):
-                os.makedirs(dir.strip())
-            else:
-                raise OSError(dir + " already exists. Command Unsuccessful")
-
-
-# Checks if file exists and if it does delete it
-class Rm(Application):
-    def exec(self, args, output):
-        self.u.check_wrong_flag(args, False)
-        args, stdin = self.u.check_if_stdin_file(args)
-
-        for file in args:
-            if os.path.isfile(file.strip()):
-                os.remove(file.strip())
-            else:
-                raise OSError(file + " is not a valid file path.")
-
-
-# Counts the no. of lines, words and bytes in a file(s)
-class Wc(Application):
-    def exec(self, args, output):
-        self.u.check_wrong_flag(args, False)
-        args, stdin = self.u.check_if_stdin_file(args)
-
-        if not stdin:
-            for file in args:
-                lines = open_file(file)
-                line_count, word_count, byte_count = self.wc_counter(lines)
-                output.append(f"{file}:{line_count}:{word_count}:{byte_count}")
-        else:
-            line_count, word_count, byte_count = self.wc_counter(args)
-            output.append(f"{line_count}:{word_count}:{byte_count}")
-
-    def word_count(self, lines):
-        count = 0
-        for i in lines:
-            count += len(i.split())
-        return count
-
-    def wc_counter(self, lines):
-        line_count = len(lines)
-        word_count = self.word_count(lines)
-        byte_count = sum(len(i) for i in lines)
-        return line_count, word_count, byte_count
+import re
+import os
+import stat
+import sys
+import threading
+from colorama import Fore
+from os import listdir
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, groupby, islice
+from operator import itemgetter
+from multiprocessing import parent_process
+from file_handling import iter_file, invalidate_file, \
+    read_last_lines, LineView
+from lru_cache import LRUCache
+from sorting import sort_lines
+from pipeline import get_process_pool
+from streams import close
+from find_index import load_index, build_index, FILE, OTHER, DIRECTORY, \
+    LINK
+import fnmatch
+
+# Number of bytes wc reads from a file at a time, the number of stdin lines
+# it counts at a time, and the number of files it counts in parallel.
+WC_CHUNK_SIZE = 1 << 20
+WC_BATCH_SIZE = 4096
+WC_WORKERS = os.cpu_count() or 1
+
+# Compiled grep patterns, kept for the session.
+PATTERN_CACHE_SIZE = 128
+pattern_cache = LRUCache(PATTERN_CACHE_SIZE)
+pattern_cache_lock = threading.Lock()
+
+
+def compile_pattern(pattern, flags=0):
+    with pattern_cache_lock:
+        compiled = pattern_cache.get((pattern, flags))
+        if compiled is None:
+            compiled = re.compile(pattern, flags)
+            pattern_cache.put((pattern, flags), compiled)
+    return compiled
+
+
+# Number of files grep searches at a time.
+GREP_WORKERS = os.cpu_count() or 1
+
+
+def set_grep_workers(workers):
+    global GREP_WORKERS
+    if workers < 1:
+        raise ValueError("grep needs at least one worker")
+    GREP_WORKERS = workers
+
+
+# Total size in bytes of the files below which grep searches them one at a
+# time. Starting the process pool takes a few hundred milliseconds, which
+# only pays off for large inputs.
+GREP_PARALLEL_SIZE = 64 << 20
+
+
+def set_grep_parallel_size(size):
+    global GREP_PARALLEL_SIZE
+    if size < 0:
+        raise ValueError("grep needs a non-negative size")
+    GREP_PARALLEL_SIZE = size
+
+
+# Number of directories find scans at a time. Scanning waits on the file
+# system, so it uses more threads than there are CPUs.
+FIND_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+
+def set_find_workers(workers):
+    global FIND_WORKERS
+    if workers < 1:
+        raise ValueError("find needs at least one worker")
+    FIND_WORKERS = workers
+
+
+# Number of bytes checked at a time by is_plain_text.
+SCAN_BLOCK_SIZE = 1 << 20
+
+# Grep goes back to matching a line at a time if, after DENSE_MATCHES
+# matching lines, there are fewer than DENSE_MATCH_GAP bytes per match.
+DENSE_MATCHES = 256
+DENSE_MATCH_GAP = 256
+
+
+# Return True if the data is ASCII without "\r". Grep only scans such files
+# as a whole: a bytes pattern would match a multi-byte character as several
+# characters, and "\r\n" is read as "\n" by the line iterators.
+def is_plain_text(data):
+    for i in range(0, len(data), SCAN_BLOCK_SIZE):
+        block = data[i:i + SCAN_BLOCK_SIZE]
+        if not block.isascii() or b"\r" in block:
+            return False
+    return True
+
+
+# Return True if the search for the pattern can skip to its first
+# characters, which makes scanning a whole file fast: the pattern starts
+# with a plain character that is not repeated, and has no alternatives.
+def has_literal_prefix(pattern):
+    first = pattern[:1]
+    return first != "" and re.escape(first) == first \
+        and pattern[1:2] not in ("*", "?", "{") and "|" not in pattern
+
+
+# Return True if the pattern has a lookahead or lookbehind. Scanning a
+# whole file would let those see the neighbouring lines.
+def has_lookaround(pattern):
+    return "(?=" in pattern or "(?!" in pattern or "(?<" in pattern
+
+
+# Class interface for all applications
+
+
+class Application:
+    # CPU-bound applications may be run in worker processes. If the output
+    # for stdin is the same when the stdin lines are split into parts and
+    # the outputs joined, the parts can go to different workers.
+    cpu_bound = False
+    splits_stdin = False
+
+    def __init__(self):
+        self.u = UtilityMethods()
+
+    def exec(self, args, output):
+        pass
+
+    # Return an iterator over the output lines.
+    # Applications that need all of their input run to completion on a list
+    # of the stdin lines before yielding anything.
+    def stream(self, args):
+        args = [arg if isinstance(arg, str) else list(arg) for arg in args]
+        output = deque()
+        self.exec(args, output)
+        yield from output
+
+
+# Class interface for applications that consume stdin and produce output
+# lazily, one line at a time.
+
+
+class StreamingApplication(Application):
+    def exec(self, args, output):
+        output.extend(self.stream(args))
+
+    def stream(self, args):
+        return iter(())
+
+# Class of utility methods for applications:
+
+
+class UtilityMethods:
+
+    # If taking input from stdin, return the stdin iterator,
+    # otherwise an iterator over the lines in the text file.
+    def check_if_stdin_iter(self, args):
+        if isinstance(args[0], str):
+            return iter_file(args[0])
+        return iter(args[0])
+
+    # If taking input from stdin,
+    # return the correct list of args.
+    def check_if_stdin_file(self, args):
+        try:
+            os.path.isfile(args[0])
+        except TypeError:
+            return args[0], True
+        else:
+            return args, False
+
+    # Template method for head and tail.
+    # Return the args after the -n option and the number of lines.
+    def head_tail_options(self, args):
+        num_lines = 10
+        if args[0] == '-n':
+            num_lines = int(args[1])
+            args = args[2:]
+        self.check_wrong_flag(args)
+        return args, num_lines
+
+    # Raise an error if invalid flags are used.
+    def check_wrong_flag(self, args, flags=True):
+        if isinstance(args[0], str) and args[0][0] == '-':
+            if flags:
+                raise ValueError("Wrong flag")
+            else:
+                raise ValueError("this application does not accept flags.")
+
+
+# Applications:
+
+
+# Changes current directory to the specified directory.
+class Cd(Application):
+    def exec(self, args, output):
+        os.chdir(args[0])
+
+
+# Prints the current directory.
+class Pwd(Application):
+    def exec(self, args, output):
+        output.append(os.getcwd())
+
+
+# Prints all arguments in output.
+class Echo(StreamingApplication):
+    def stream(self, args):
+        for i in args:
+            yield i + " "
+
+
+# Lists all the files in the specified directory.
+class Ls(Application):
+    def exec(self, args, output):
+        if len(args) == 0:
+            ls_dir = os.getcwd()
+        else:
+            ls_dir = args[0]
+        # Prevents hidden folders from being outputted by ls
+        for f in listdir(ls_dir):
+            if not f.startswith("."):
+                output.append(f + "\n")
+
+
+# Prints the contents of a file to output
+class Cat(StreamingApplication):
+    def stream(self, args):
+        for a in args:
+            if isinstance(a, str):
+                yield from iter_file(a)
+            # Getting args from stdin instead.
+            else:
+                yield from a
+
+
+# Gives first n number of lines from a text file
+class Head(StreamingApplication):
+    def stream(self, args):
+        args, num_lines = self.u.head_tail_options(args)
+        lines = self.u.check_if_stdin_iter(args)
+
+        # If num_lines > the number of lines in the file,
+        # then output all lines. Stop reading the file, or the producer of
+        # the lines, as soon as enough have been read.
+        try:
+            yield from islice(lines, max(num_lines, 0))
+        finally:
+            close(lines)
+
+
+# Gives last n number of lines from a text file
+class Tail(StreamingApplication):
+    def stream(self, args):
+        args, num_lines = self.u.head_tail_options(args)
+
+        # Files are read backwards from the end. Only the last num_lines
+        # lines of stdin are kept while it is read.
+        if isinstance(args[0], str):
+            yield from read_last_lines(args[0], num_lines)
+        else:
+            yield from deque(args[0], maxlen=max(num_lines, 0))
+
+
+# Finds all instances of a pattern in a file and outputs them
+class Grep(StreamingApplication):
+    cpu_bound = True
+    splits_stdin = True
+
+    def stream(self, args):
+        # Grep doesn't accept any flags
+        self.u.check_wrong_flag(args, False)
+
+        pattern = args.pop(0)
+        files, stdin = self.u.check_if_stdin_file(args)
+        matches = self.matcher(pattern)
+        # Highlight the pattern in each line in cyan except for
+        # when testing to avoid test failures.
+        highlight = sys.stdout.isatty()
+
+        if stdin:
+            for line in filter(matches, files):
+                yield self.highlight(pattern, line) if highlight else line
+            return
+
+        files = [file for file in files if isinstance(file, str)]
+        for file, lines in self.match_files(files, pattern, matches):
+            for line in lines:
+                if highlight:
+                    line = self.highlight(pattern, line)
+                if len(files) > 1:
+                    yield f"{file}:{line}"
+                else:
+                    yield line
+
+    # Yield each file with its matching lines, in the order of the files.
+    # Several files of GREP_PARALLEL_SIZE bytes or more in total are
+    # searched in parallel in the process pool, with up to GREP_WORKERS
+    # files at a time, unless grep is already running in a worker process.
+    def match_files(self, files, pattern, matches):
+        if len(files) < 2 or GREP_WORKERS < 2 \
+                or parent_process() is not None \
+                or self.total_size(files) < GREP_PARALLEL_SIZE:
+            for file in files:
+                yield file, self.match_file(file, pattern, matches)
+            return
+
+        pool = get_process_pool()
+        cwd = os.getcwd()
+        pending = deque()
+        try:
+            for file in files:
+                pending.append(
+                    (file, pool.submit(grep_file, pattern, file, cwd)))
+                if len(pending) >= GREP_WORKERS:
+                    file, future = pending.popleft()
+                    yield file, future.result()
+            while pending:
+                file, future = pending.popleft()
+                yield file, future.result()
+        finally:
+            for file, future in pending:
+                future.cancel()
+
+    # Return the total size of the files, stopping once it reaches
+    # GREP_PARALLEL_SIZE. Missing files are left for the search to report.
+    def total_size(self, files):
+        total = 0
+        for file in files:
+            try:
+                total += os.path.getsize(file)
+            except OSError:
+                pass
+            if total >= GREP_PARALLEL_SIZE:
+                break
+        return total
+
+    # Yield the lines of the file matching the pattern. Plain ASCII files
+    # are searched as a whole with a bytes pattern over a memory map, so
+    # that only the matching lines are decoded. Other files, patterns
+    # without a literal prefix and files where most lines match are
+    # matched a line at a time.
+    def match_file(self, file, pattern, matches):
+        if not (pattern.isascii() and has_literal_prefix(pattern)) \
+                or has_lookaround(pattern):
+            return filter(matches, iter_file(file))
+        return self.scan_file(file, pattern, matches)
+
+    def scan_file(self, file, pattern, matches):
+        view = LineView(file)
+        try:
+            data = view.data
+            regex = None
+            if is_plain_text(data):
+                try:
+                    regex = compile_pattern(pattern.encode(), re.MULTILINE)
+                except re.error:
+                    pass
+            if regex is None:
+                yield from filter(matches, view)
+                return
+
+            end = len(data)
+            start = 0
+            count = 0
+            while start < end:
+                if count == DENSE_MATCHES and start < count * DENSE_MATCH_GAP:
+                    # Skip the lines already found.
+                    lines = filter(matches, iter_file(file))
+                    yield from islice(lines, count, None)
+                    return
+                match = regex.search(data, start)
+                if match is None:
+                    return
+                # The pattern has to match at the start of the line.
+                start = data.rfind(b"\n", start, match.start()) + 1 or start
+                if match.start() != start:
+                    match = regex.match(data, start)
+                stop = data.find(b"\n", start) + 1 or end
+                if match is not None:
+                    line = data[start:stop].decode()
+                    # A match running past the end of its line may hide a
+                    # shorter one within it, so check the line on its own.
+                    if match.end() <= stop or matches(line):
+                        count += 1
+                        yield line
+                start = stop
+        finally:
+            view.close()
+
+    # Return a function telling whether a line matches the pattern at its
+    # start. Patterns without special characters are compared directly.
+    def matcher(self, pattern):
+        if re.escape(pattern) == pattern:
+            return lambda line: line.startswith(pattern)
+        return compile_pattern(pattern).match
+
+    # Highlights the searched for substring when outputting to terminal
+    def highlight(self, pattern, line):
+        line = line.replace(pattern, Fore.LIGHTCYAN_EX + pattern + Fore.RESET)
+        return line
+
+
+# Return the lines of the file matching the pattern. Run in the process
+# pool by grep.
+def grep_file(pattern, file, cwd):
+    os.chdir(cwd)
+    grep = Grep()
+    return list(grep.match_file(file, pattern, grep.matcher(pattern)))
+
+
+# Outputs a file after removing duplicate lines
+class Uniq(StreamingApplication):
+    def stream(self, args):
+        modes = self.uniq_options(args)
+        # A file given as an argument is read instead of stdin.
+        if any(isinstance(arg, str) for arg in args):
+            for arg in args:
+                if not isinstance(arg, str):
+                    close(arg)
+            args = [arg for arg in args if isinstance(arg, str)]
+        if len(args) != 1:
+            raise ValueError("wrong number of command line arguments")
+
+        # Lines are compared without surrounding whitespace, and without
+        # case with -i. Each line is normalised once, and groupby only
+        # keeps the key of the current group.
+        if "i" in modes:
+            def key(line):
+                return line.strip().lower()
+        else:
+            key = str.strip
+
+        lines = self.u.check_if_stdin_iter(args)
+        for _, group in groupby(lines, key):
+            line = next(group)
+            if "c" in modes or "d" in modes:
+                count = 1
+                for _ in group:
+                    count += 1
+                if "d" in modes and count == 1:
+                    continue
+                if "c" in modes:
+                    line = f"{count:>7} {line}"
+            yield line
+
+    # Remove the -i, -c and -d flags from args and return their letters.
+    def uniq_options(self, args):
+        modes = ""
+        while len(args) > 0 and isinstance(args[0], str) \
+                and args[0].startswith("-"):
+            flag = args.pop(0)
+            if len(flag) == 1 or any(c not in "icd" for c in flag[1:]):
+                raise ValueError("Wrong flag")
+            modes += flag[1:]
+        return modes
+
+
+# Sort lines of text files in alphabetical or reversed order
+class Sort(StreamingApplication):
+    cpu_bound = True
+
+    def stream(self, args):
+        rev = False
+        if args[0] == '-r':
+            rev = True
+            args.pop(0)
+
+        self.u.check_wrong_flag(args)
+
+        lines = self.u.check_if_stdin_iter(args)
+        yield from sort_lines(lines, rev)
+
+
+# Removes section from each line in a file
+class Cut(StreamingApplication):
+    cpu_bound = True
+    splits_stdin = True
+
+    def stream(self, args):
+        options = self.cut_options(args)
+        if set(options) == {"-b"}:
+            return self.cut_b(args, options["-b"])
+        elif "-f" in options and "-b" not in options:
+            return self.cut_f(args, options["-f"], options.get("-d", "\t"))
+        else:
+            raise ValueError("Wrong flags")
+
+    # Remove the -b, -d and -f options from args and return their values
+    # keyed by flag.
+    def cut_options(self, args):
+        options = {}
+        while len(args) > 0 and args[0] in ("-b", "-d", "-f"):
+            flag = args.pop(0)
+            if flag in options or len(args) == 0 \
+                    or not isinstance(args[0], str):
+                raise ValueError("Wrong flags")
+            options[flag] = args.pop(0)
+        return options
+
+    def cut_b(self, args, spec):
+        cut = self.byte_cutter(self.ranges(spec))
+        lines = self.u.check_if_stdin_iter(args)
+        return map(cut, lines)
+
+    def cut_f(self, args, spec, delimiter):
+        if len(delimiter) != 1:
+            raise ValueError("the delimiter must be a single character")
+        cut = self.field_cutter(self.ranges(spec), delimiter)
+        lines = self.u.check_if_stdin_iter(args)
+        return map(cut, lines)
+
+    # Parse a list such as "1,3-5,-2,7-" into slices of the 0-based offsets
+    # to extract, sorted and with overlapping ranges merged, so that every
+    # byte or field is output once and in order. An open range stops at
+    # sys.maxsize.
+    def ranges(self, spec):
+        ranges = []
+        for part in spec.split(","):
+            first, dash, last = part.partition("-")
+            if not (first or last) or not (first + last).isdigit():
+                raise ValueError(f"invalid list {spec}")
+            start = int(first) - 1 if first else 0
+            if not dash:
+                stop = start + 1
+            else:
+                stop = int(last) if last else sys.maxsize
+            if start < 0 or stop <= start:
+                raise ValueError(f"invalid list {spec}")
+            ranges.append((start, stop))
+
+        merged = []
+        for start, stop in sorted(ranges):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(stop, merged[-1][1]))
+            else:
+                merged.append((start, stop))
+        return [slice(start, stop) for start, stop in merged]
+
+    # Return a function cutting the bytes in the slices out of a line with
+    # one itemgetter call. ASCII lines are cut as strings, as each character
+    # is one byte; other lines are cut as UTF-8 bytes. The newline ending a
+    # line is its last byte, so it is kept if a slice reaches it.
+    def byte_cutter(self, slices):
+        getter = itemgetter(*slices)
+        if len(slices) == 1:
+            pick = pick_bytes = getter
+        else:
+            def pick(text):
+                return "".join(getter(text))
+
+            def pick_bytes(data):
+                return b"".join(getter(data))
+
+        def cut(line):
+            if line.isascii():
+                line = pick(line)
+            else:
+                # A multi-byte character split by the list is replaced.
+                line = pick_bytes(line.encode()).decode(errors="replace")
+            return line if line.endswith("\n") else line + "\n"
+        return cut
+
+    # Return a function cutting the fields in the slices out of a line. The
+    # line is split only as far as the last field wanted, so the rest of it
+    # stays in one piece. Lines without the delimiter are printed whole.
+    def field_cutter(self, slices, delimiter):
+        stop = slices[-1].stop
+        maxsplit = -1 if stop == sys.maxsize else stop
+        if len(slices) == 1:
+            (fields_wanted,) = slices
+        else:
+            getter = itemgetter(*slices)
+
+        def cut(line):
+            if line.endswith("\n"):
+                line = line[:-1]
+            if delimiter not in line:
+                return line + "\n"
+            fields = line.split(delimiter, maxsplit)
+            if len(slices) == 1:
+                fields = fields[fields_wanted]
+            else:
+                fields = chain.from_iterable(getter(fields))
+            return delimiter.join(fields) + "\n"
+        return cut
+
+
+# Finds all files that match a pattern in a specified path
+class Find(StreamingApplication):
+    def stream(self, args):
+        args = [arg for arg in args if isinstance(arg, str)]
+        path = "." if len(args) == 0 or args[0].startswith("-") \
+            else args.pop(0)
+        options = dict(zip(args[::2], args[1::2]))
+        # fnmatch() translates the pattern again for every name, so it is
+        # translated and compiled once.
+        matches = compile_pattern(
+            fnmatch.translate(options.get("-name", "*"))).match
+        max_depth = int(options.get("-maxdepth", sys.maxsize))
+        kind = options.get("-type")
+
+        # Only directories are printed for -type d, including the path.
+        name = os.path.basename(os.path.normpath(path))
+        if kind == "d" and matches(name) and os.path.isdir(path):
+            yield path + "\n"
+        if max_depth == 0:
+            return
+        # Trees indexed with the index application are searched in their
+        # index, others are walked.
+        index = load_index(path) if os.path.isdir(path) else None
+        if index is not None:
+            yield from self.search_index(index, path, matches, max_depth,
+                                         kind)
+        else:
+            yield from self.walk(path, matches, max_depth, kind)
+
+    # Yield the matching paths from the index of the tree. Directories
+    # changed since they were indexed are scanned again, and the updated
+    # index is saved.
+    def search_index(self, index, path, matches, max_depth, kind):
+        kinds = {None: (FILE, OTHER), "d": (DIRECTORY, LINK),
+                 "f": (FILE,)}[kind]
+        try:
+            for directory, entries in index.walk(max_depth):
+                prefix = os.path.join(path, directory, "")
+                for entry_kind in kinds:
+                    for name in filter(matches, entries[entry_kind]):
+                        yield prefix + name + "\n"
+        finally:
+            if index.changed:
+                try:
+                    index.save()
+                except OSError:
+                    # The index is only a cache; the next query updates it.
+                    pass
+
+    # Yield the matching paths under root, a directory at a time. The
+    # subdirectories of a directory are scanned on a thread pool while its
+    # matches are printed, and their results are printed depth first in
+    # the order scandir() found them, so the order does not depend on the
+    # number of workers.
+    def walk(self, root, matches, max_depth, kind):
+        pool = ThreadPoolExecutor(FIND_WORKERS)
+        scans = [deque([pool.submit(self.scan, root, 1, matches, max_depth,
+                                    kind)])]
+        try:
+            while len(scans) > 0:
+                if len(scans[-1]) == 0:
+                    scans.pop()
+                    continue
+                found, subdirs, depth = scans[-1].popleft().result()
+                yield from found
+                if len(subdirs) > 0:
+                    scans.append(deque(
+                        pool.submit(self.scan, subdir, depth + 1, matches,
+                                    max_depth, kind)
+                        for subdir in subdirs))
+        finally:
+            # Scans not started yet are dropped if the output is not read
+            # to the end.
+            for pending in scans:
+                for scan in pending:
+                    scan.cancel()
+            pool.shutdown()
+
+    # Return the matching entries of the directory, the subdirectories to
+    # walk and the depth of the entries. The types come from the DirEntry,
+    # which usually knows them without a stat() call. Like os.walk(),
+    # symbolic links to directories are not followed and unreadable
+    # directories are skipped.
+    def scan(self, directory, depth, matches, max_depth, kind):
+        found = []
+        subdirs = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        if depth < max_depth and not entry.is_symlink():
+                            subdirs.append(entry.path)
+                        if kind == "d" and matches(entry.name):
+                            found.append(entry.path + "\n")
+                    elif kind != "d" and matches(entry.name) \
+                            and (kind is None or entry.is_file()):
+                        found.append(entry.path + "\n")
+        except OSError:
+            pass
+        return found, subdirs, depth
+
+
+# Builds the find index of each directory tree given, by default the current
+# directory. find then answers queries on the tree from the index.
+class Index(Application):
+    def exec(self, args, output):
+        if args:
+            self.u.check_wrong_flag(args, False)
+        args = [arg for arg in args if isinstance(arg, str)]
+        for path in args or ["."]:
+            build_index(path)
+
+
+# Checks if directory already exists and if not creates it
+class Mkdir(Application):
+    def exec(self, args, output):
+        self.u.check_wrong_flag(args, False)
+        args, stdin = self.u.check_if_stdin_file(args)
+
+        for dir in args:
+            if not os.path.isdir(dir.strip()):
+                os.makedirs(dir.strip())
+            else:
+                raise OSError(dir + " already exists. Command Unsuccessful")
+
+
+# Checks if file exists and if it does delete it
+class Rm(Application):
+    def exec(self, args, output):
+        self.u.check_wrong_flag(args, False)
+        args, stdin = self.u.check_if_stdin_file(args)
+
+        for file in args:
+            if os.path.isfile(file.strip()):
+                invalidate_file(file.strip())
+                os.remove(file.strip())
+            else:
+                raise OSError(file + " is not a valid file path.")
+
+
+# Counts the no. of lines, words and bytes in a file(s)
+class Wc(StreamingApplication):
+    cpu_bound = True
+
+    def stream(self, args):
+        modes = self.wc_options(args)
+        if len(args) == 0:
+            raise ValueError("wrong number of command line arguments")
+
+        if isinstance(args[0], str):
+            # Files are counted in parallel and printed in the given order.
+            files = [arg for arg in args if isinstance(arg, str)]
+            workers = min(len(files), WC_WORKERS)
+            with ThreadPoolExecutor(workers) as pool:
+                counts = pool.map(lambda file: self.count_file(file, modes),
+                                  files)
+                for file, count in zip(files, counts):
+                    yield ":".join([file] + self.select(count, modes))
+        else:
+            count = self.count_stdin(args[0], modes)
+            yield ":".join(self.select(count, modes))
+
+    # Remove the -l, -w and -c flags from args and return the letters of
+    # the counts to print. All three are printed if none is given.
+    def wc_options(self, args):
+        modes = ""
+        while len(args) > 0 and isinstance(args[0], str) \
+                and args[0].startswith("-"):
+            flag = args.pop(0)
+            if len(flag) == 1 or any(c not in "lwc" for c in flag[1:]):
+                raise ValueError("Wrong flag")
+            modes += flag[1:]
+        return modes or "lwc"
+
+    # Return the counts in the order lines, words, bytes.
+    def select(self, count, modes):
+        return [str(n) for n, mode in zip(count, "lwc") if mode in modes]
+
+    # Count the lines, words and bytes of the file, reading it in binary
+    # chunks. Lines are counted as newline characters, like UNIX wc.
+    def count_file(self, file, modes):
+        with open(file, "rb") as f:
+            if modes == "c" and stat.S_ISREG(os.fstat(f.fileno()).st_mode):
+                return 0, 0, os.fstat(f.fileno()).st_size
+            chunks = iter(lambda: f.read(WC_CHUNK_SIZE), b"")
+            return self.count_chunks(chunks, "w" in modes)
+
+    def count_chunks(self, chunks, count_words):
+        line_count = word_count = byte_count = 0
+        in_word = False
+        for chunk in chunks:
+            line_count += chunk.count(b"\n")
+            byte_count += len(chunk)
+            if count_words:
+                word_count += len(chunk.split())
+                # A word running over the chunk boundary was counted twice.
+                if in_word and not chunk[:1].isspace():
+                    word_count -= 1
+                in_word = not chunk[-1:].isspace()
+        return line_count, word_count, byte_count
+
+    # Count the lines, words and bytes of stdin, where every line of stdin
+    # counts as a line. The lines are joined into chunks a batch at a time.
+    def count_stdin(self, lines, modes):
+        lines = iter(lines)
+        line_count = word_count = byte_count = 0
+        while True:
+            batch = list(islice(lines, WC_BATCH_SIZE))
+            if not batch:
+                return line_count, word_count, byte_count
+            line_count += len(batch)
+            if modes == "l":
+                continue
+            # The lines are joined with newlines so that no words are
+            # joined; those are not counted as bytes.
+            data = "\n".join(batch).encode()
+            byte_count += len(data) - len(batch) + 1
+            if "w" in modes:
+                word_count += len(data.split())
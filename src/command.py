@@ -1,256 +1,201 @@
-from application import Echo, Cd, Pwd, Ls, Cat, Head, Tail, Grep, \
-    Uniq, Sort, Cut, Find, Rm, Mkdir, Wc
-from glob import glob
-from unsafe_decorator import UnsafeDecorator
-from file_handling import open_file, make_file
-
-app = [
-    "echo", "pwd", "cd", "ls", "cat", "head", "tail",
-    "grep", "uniq", "cut", "sort", "find", "rm", "mkdir", "wc",
-    "_echo", "_pwd", "_cd", "_ls", "_cat", "_head", "_tail",
-    "_grep", "_uniq", "_cut", "_sort", "_find", "_rm", "_mkdir", "_wc"
-]
-
-
-# Class interface for each Command. A command is either a Pipe, Seq or Call.
-class Command:
-
-    def __init__(self, command):
-        self.command = command
-
-    def __eq__(self, other):
-        return self.command == other.command
-
-    # All commands would require an eval function
-    def eval(self, input, output):
-        pass
-
-    # If arguments require globbing replace the arguments
-    # with the matching list of files found.
-    def globbing(self):
-        cmd = self.command[0]
-        for i in range(len(cmd)):
-            if '*' in cmd[i]:
-                globbing = glob(cmd[i])
-                if globbing:
-                    self.command[0].pop(i)
-                    self.command[0].extend(globbing)
-
-    # Iterate through the command and append arguments in
-    # the stdin to the input deque.
-    def input_redir(self, input):
-        num_of_files = 0
-        index_of_file = 0
-        input_redir = False
-        for i in range(len(self.command)):
-            if self.command[i][0] == "<":
-                if len(self.command[i]) == 2 and num_of_files == 0:
-                    input.append(open_file(self.command[i][1]))
-                    num_of_files += 1
-                    index_of_file = i
-                    input_redir = True
-                else:
-                    raise ValueError("Several files cannot be specified "
-                                     "for input redirection.")
-        if input_redir is True:
-            self.command.pop(index_of_file)
-
-    # Write the output to the specified file.
-    def output_redir(self, file, output, append=False):
-        lines = list(output)
-        lines = [line + "\n" for line in lines]
-        if append:
-            f = open(file, "a+")
-            f.writelines(lines)
-            f.close()
-        else:
-            make_file(file, lines)
-        output.clear()
-
-# Classes for each command:
-
-
-class Pipe(Command):
-
-    def __init__(self, command):
-        super().__init__(command)
-
-    def eval(self, input, output):
-        prev_cmd = 0
-        # Iterate through the list of commands.
-        for i in range(1, len(self.command)):
-
-            if self.command[i][0] in app:
-                output.clear()
-
-                # Create a Call object for each Call command in the list
-                # and execute it.
-                c = Call(self.command[prev_cmd: i])
-                c.eval([list(input)], output)
-
-                prev_cmd = i
-
-                # Copy the output into the input for the next command.
-                input = output.copy()
-
-        # Finally, execute the last command not included in the loop.
-        c = Call(self.command[prev_cmd:])
-        output.clear()
-        c.eval([list(input)], output)
-
-
-class Seq(Command):
-
-    def __init__(self, command):
-        super().__init__(command)
-
-    def eval(self, input, output):
-        prev_cmd = 0
-
-        for i in range(1, len(self.command)):
-
-            # Iterate through the list of commands.
-            if self.command[i][0] in app:
-
-                # Create a Call object for each Call command in the list
-                # and execute it.
-                c = Call(self.command[prev_cmd: i])
-                c.eval(input, output)
-                prev_cmd = i
-
-        c = Call(self.command[prev_cmd:])
-        c.eval(input, output)
-
-
-class Call(Command):
-
-    def __init__(self, command):
-        super().__init__(command)
-        self.app = None
-        self.args = None
-        self.out = None
-
-    def eval(self, input, output):
-        self.input_redir(input)
-        self.globbing()
-        safe = True
-        self.app = self.command[0][0]
-        self.args = self.command[0][1:]
-        self.input = list(input)
-        self.out = output
-        self.application = None
-
-        if len(self.input) != 0:
-            if len(self.input[0]) != 0:
-                self.args.extend(self.input)
-
-        for i in range(len(self.args)):
-            if ("'" in self.args[i] or '"' in self.args[i]) \
-                    and self.args[i] != "''":
-                self.args[i] = self.args[i][1:-1]
-
-        # Check if this is an unsafe application.
-        if self.app[0] == '_':
-            safe = False
-            self.app = self.app[1:]
-
-        # Factory pattern implemented.
-        # Each function returns the Application object.
-        func = {
-            "head": self.run_head,
-            "tail": self.run_tail,
-            "uniq": self.run_uniq,
-            "pwd": self.run_pwd,
-            "cd": self.run_cd,
-            "ls": self.run_ls,
-            "cat": self.run_cat,
-            "grep": self.run_grep,
-            "sort": self.run_sort,
-            "cut": self.run_cut,
-            "echo": self.run_echo,
-            "find": self.run_find,
-            "rm": self.run_rm,
-            "mkdir": self.run_mkdir,
-            "wc": self.run_wc
-        }
-
-        self.application = func[self.app]()
-        if self.application is not None:
-            if safe:
-                self.application.exec(self.args, self.out)
-            else:
-                decorator = UnsafeDecorator(self.application)
-                decorator.exec(self.args, self.out)
-        else:
-            raise ValueError(f"unsupported application {self.app}")
-
-        if len(self.command) > 1 and (self.command[1][0] == ">"
-                                      or self.command[1][0] == ">>"):
-            if len(self.command[1]) > 2:
-                raise ValueError("Several files cannot be specified "
-                                 "for output redirection.")
-            append = True if self.command[1][0] == ">>" else False
-            self.output_redir(str(self.command[1][1]), self.out, append)
-
-    # Checks if the correct amount of arguments has been provided to an app
-    # Considers if the application is allowed unlimited args.
-    def check_arguments(self, num_of_arguments, app, limited_args=True):
-        if ((len(self.args) in num_of_arguments and not limited_args)
-                or (len(self.args) not in num_of_arguments and limited_args)):
-            raise ValueError("wrong number of command line arguments")
-        else:
-            return app()
-
-    def run_head(self):
-        return self.check_arguments([1, 3], Head)
-
-    def run_tail(self):
-        return self.check_arguments([1, 3], Tail)
-
-    def run_uniq(self):
-        return self.check_arguments([1, 2], Uniq)
-
-    def run_sort(self):
-        return self.check_arguments([1, 2], Sort)
-
-    def run_pwd(self):
-        return Pwd()
-
-    def run_cd(self):
-        return self.check_arguments([1], Cd)
-
-    def run_echo(self):
-        return Echo()
-
-    def run_ls(self):
-        return self.check_arguments([0, 1], Ls)
-
-    def run_cat(self):
-        return Cat()
-
-    def run_grep(self):
-        return self.check_arguments([0, 1], Grep, False)
-
-    def run_cut(self):
-        return self.check_arguments([3], Cut)
-
-    def run_rm(self):
-        return self.check_arguments([0], Rm, False)
-
-    def run_mkdir(self):
-        return self.check_arguments([0], Mkdir, False)
-
-    def run_wc(self):
-        return self.check_arguments([0], Wc, False)
-
-    def run_find(self):
-        for i in self.args:
-            if i[0] == '-' and i != '-name':
-                raise ValueError("wrong flag used")
-        if "-name" in self.args and self.args[-1] == "-name":
-            raise ValueError("missing argument to '-name'")
-        elif "-name" in self.args and self.args[-2] != "-name":
-            raise ValueError("paths must precede expression")
-        elif len(self.args) == 0:
-            self.args = ["."]
-        return Find()
+import os
+from collections import namedtuple
+from glob import glob
+from unsafe_decorator import UnsafeDecorator
+from file_handling import iter_file, make_file, invalidate_file
+from registry import lookup
+from streams import peek, close
+from pipeline import run_threaded, ProcessApplication
+
+
+# Class interface for each Command. A command is either a Pipe, Seq or Call.
+# Commands are immutable once built, so the same object can be evaluated
+# any number of times.
+class Command:
+    __slots__ = ()
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, slot) == getattr(other, slot)
+            for slot in self.__slots__)
+
+    def __repr__(self):
+        fields = ", ".join(repr(getattr(self, slot))
+                           for slot in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+    # All commands would require an eval function.
+    # input is an iterable of the lines given to the command on stdin and
+    # the output lines are appended to output.
+    def eval(self, input, output):
+        pass
+
+
+# Ways of running the calls of a pipe:
+# "sequential" runs each call to completion before the next one starts,
+# "stream" connects the calls with iterators so lines flow through the
+# whole pipe one at a time, "threaded" runs each call in its own thread
+# with batches of lines passed through bounded queues, and "process" is
+# "threaded" with CPU-bound applications run in a pool of worker processes.
+PIPELINE_MODES = ("sequential", "stream", "threaded", "process")
+
+
+def set_pipeline_mode(mode):
+    if mode not in PIPELINE_MODES:
+        raise ValueError(f"unknown pipeline mode {mode}")
+    Pipe.mode = mode
+
+
+# A redirection operator ("<", ">" or ">>") and the files that follow it.
+Redirection = namedtuple("Redirection", ["operator", "files"])
+
+# Classes for each command:
+
+
+class Pipe(Command):
+    __slots__ = ("calls",)
+    mode = "stream"
+
+    def __init__(self, calls):
+        self.calls = tuple(calls)
+
+    def eval(self, input, output):
+        if self.mode in ("threaded", "process"):
+            run_threaded(self.calls, input, output,
+                         processes=self.mode == "process")
+            return
+
+        # The output of each call is the input of the next one.
+        stages = []
+        try:
+            lines = input
+            for call in self.calls:
+                lines = call.stream(lines)
+                stages.append(lines)
+                if self.mode == "sequential":
+                    lines = list(lines)
+
+            output.extend(lines)
+        finally:
+            # Once the last call is done, or one of them failed, stop the
+            # calls still producing lines for it.
+            for lines in reversed(stages):
+                close(lines)
+
+
+class Seq(Command):
+    __slots__ = ("commands",)
+
+    def __init__(self, commands):
+        self.commands = tuple(commands)
+
+    def eval(self, input, output):
+        for command in self.commands:
+            command.eval(input, output)
+
+
+class Call(Command):
+    __slots__ = ("app", "args", "redirections")
+
+    def __init__(self, app, args=(), redirections=()):
+        self.app = app
+        self.args = tuple(args)
+        self.redirections = tuple(Redirection(operator, tuple(files))
+                                  for operator, files in redirections)
+
+    # If arguments require globbing replace the arguments
+    # with the matching list of files found.
+    def globbing(self, args):
+        expanded = []
+        for arg in args:
+            matches = glob(arg) if '*' in arg else None
+            if matches:
+                expanded.extend(matches)
+            else:
+                expanded.append(arg)
+        return expanded
+
+    # Return the lines given by input redirection, or input if there is none.
+    def input_redir(self, input):
+        redirections = [r for r in self.redirections if r.operator == "<"]
+        if len(redirections) == 0:
+            return input
+        if len(redirections) > 1 or len(redirections[0].files) != 1:
+            raise ValueError("Several files cannot be specified "
+                             "for input redirection.")
+        return iter_file(redirections[0].files[0])
+
+    # Return the output redirection of the call, or None if there is none.
+    def output_redirection(self):
+        redirections = [r for r in self.redirections
+                        if r.operator in (">", ">>")]
+        if len(redirections) == 0:
+            return None
+        if len(redirections) > 1 or len(redirections[0].files) != 1:
+            raise ValueError("Several files cannot be specified "
+                             "for output redirection.")
+        return redirections[0]
+
+    # Write the output to the file of the output redirection.
+    def output_redir(self, redirection, output):
+        operator, (file,) = redirection
+        lines = (line + "\n" for line in output)
+        if operator == ">>":
+            invalidate_file(file)
+            f = open(file, "a+")
+            f.writelines(lines)
+            f.close()
+        else:
+            make_file(file, lines)
+
+    # Start the application and return an iterator over its output.
+    # The application only runs as far as the iterator is consumed.
+    # If processes is True, a CPU-bound application runs in the process pool.
+    def stream(self, input, processes=False):
+        input = peek(self.input_redir(input))
+        args = self.globbing(self.args)
+        redirection = self.output_redirection()
+
+        if input is not None:
+            args.append(input)
+
+        for i in range(len(args)):
+            if isinstance(args[i], str) and \
+                    ("'" in args[i] or '"' in args[i]) and args[i] != "''":
+                args[i] = args[i][1:-1]
+
+        # The registry gives the Application class for the name and whether
+        # this is the unsafe variant.
+        registration = lookup(self.app)
+        registration.validator(args)
+        application = registration.application()
+        if processes and application.cpu_bound:
+            application = ProcessApplication(application)
+        if not registration.safe:
+            application = UnsafeDecorator(application)
+        lines = application.stream(args)
+        if redirection is not None:
+            if self.reads_file(args, redirection.files[0]):
+                # The application reads its files lazily, so the output is
+                # collected before the file is overwritten.
+                lines = list(lines)
+            self.output_redir(redirection, lines)
+            return iter(())
+        return lines
+
+    # Return True if the file is one of the arguments or the input
+    # redirection of the call.
+    def reads_file(self, args, file):
+        sources = [arg for arg in args if isinstance(arg, str)]
+        sources.extend(f for r in self.redirections if r.operator == "<"
+                       for f in r.files)
+        for source in sources:
+            try:
+                if os.path.samefile(source, file):
+                    return True
+            except OSError:
+                pass
+        return False
+
+    def eval(self, input, output):
+        output.extend(self.stream(input))
@@ -1,146 +1,145 @@
-from grammar.ShellVisitor import ShellVisitor
-from grammar.ShellParser import ShellParser
-from command import Pipe, Call, Seq
-from parse import parse
-
-app = [
-    "echo", "pwd", "cd", "ls", "cat", "head", "tail",
-    "grep", "uniq", "cut", "sort", "find", "rm", "mkdir", "wc",
-    "_echo", "_pwd", "_cd", "_ls", "_cat", "_head", "_tail",
-    "_grep", "_uniq", "_cut", "_sort", "_find", "_rm", "_mkdir", "_wc"
-]
-
-
-# Inherits from ShellVisitor.
-# Utilises visitor methods to walk through the parse tree and return a
-# command object.
-
-
-class Converter(ShellVisitor):
-    def __init__(self):
-        super().__init__()
-        self.command_index = -1
-        self.tree = []
-        self.sequences = 0
-        self.command_queue = []
-
-    # Visit a parse tree produced by ShellParser#command.
-    def visitCommand(self, ctx: ShellParser.CommandContext):
-        # Initialise command to be Seq, Pipe or Call object with the tree
-        # generated from visiting the child nodes, and insert it to the
-        # command queue and return the queue.
-        if ctx.command():
-            self.visit(ctx.getChild(0))
-            self.visit(ctx.getChild(2))
-            command = Seq(self.tree)
-            if command not in self.command_queue:
-                self.command_queue.insert(0, command)
-
-        elif ctx.pipe():
-            start_of_pipe = len(self.tree)
-            command = Pipe(self.visitPipe(ctx)[start_of_pipe:])
-            self.tree = self.tree[0:start_of_pipe]
-            self.command_queue.insert(0, command)
-
-        elif ctx.call():
-            command = Call(self.visitChildren(ctx))
-            return [command]
-
-        return self.command_queue
-
-    # Visit a parse tree produced by ShellParser#pipe.
-    def visitPipe(self, ctx):
-        return self.visitCall(ctx)
-
-    # Visit a parse tree produced by ShellParser#call and returns the tree.
-    def visitCall(self, ctx: ShellParser.CallContext):
-        # Increment the number of sequences in the line
-        self.sequences += 1
-        self.visitChildren(ctx)
-        return self.tree
-
-    # Visit a parse tree produced by ShellParser#atom.
-    def visitAtom(self, ctx: ShellParser.AtomContext):
-        return self.visitChildren(ctx)
-
-    # Visit a parse tree produced by ShellParser#argument.
-    def visitArgument(self, ctx: ShellParser.ArgumentContext):
-        # Checks if the argument is an application.
-        if ctx.getText() in app and len(self.tree) != self.sequences:
-            # Adds a new list for the current app in the tree and updates the
-            # index of the current command.
-            self.tree.append([])
-            self.command_index += 1
-        return self.visitChildren(ctx)
-
-    # Visit a parse tree produced by ShellParser#redirection.
-    def visitRedirection(self, ctx: ShellParser.RedirectionContext):
-        # Increment the number of sequences and current command index, and
-        # add the redirection to the tree.
-        self.sequences += 1
-        if ctx.getText()[0:2] == ">>":
-            self.tree.append([ctx.getText()[0:2]])
-        else:
-            self.tree.append([ctx.getText()[0]])
-        self.command_index += 1
-        return self.visitChildren(ctx)
-
-    # Visit a parse tree produced by ShellParser#unquoted.
-    def visitUnquoted(self, ctx: ShellParser.UnquotedContext):
-        # Add the text from the node to the tree.
-        self.tree[self.command_index].append(ctx.getText())
-        return
-
-    # Visit a parse tree produced by ShellParser#quoted.
-    def visitQuoted(self, ctx: ShellParser.QuotedContext):
-        return self.visitChildren(ctx)
-
-    # Visit a parse tree produced by ShellParser#single_quoted.
-    def visitSingle_quoted(self, ctx: ShellParser.Single_quotedContext):
-        # Add the text from the node to the tree.
-        self.tree[self.command_index].append(ctx.getText())
-        return
-
-    # Completes command substitution on backquoted text
-    def eval_nested_backquotes(self, text):
-        # Find the indexes of the backquotes in the string.
-        backquotes_index = [pos for pos, char in enumerate(text)
-                            if char == "`"]
-
-        # Isolate the command in backquotes.
-        command = text[backquotes_index[0] + 1: backquotes_index[1]]
-
-        # Adds the text on either side of the backquotes and the parsed command
-        # to the output.
-        out = [text[: backquotes_index[0]]]
-        parse(command, out, Converter())
-        out[-1] = out[-1][:-1]
-        out.append(text[backquotes_index[1] + 1:])
-
-        # Add a list for the command to the tree if necessary.
-        if len(self.tree) == 0:
-            self.tree.append([])
-            self.command_index += 1
-
-        # Adds the output to the tree.
-        self.tree[self.command_index].append("".join(out))
-
-    # Visit a parse tree produced by ShellParser#backquoted.
-    def visitBackquoted(self, ctx: ShellParser.BackquotedContext):
-        self.eval_nested_backquotes(ctx.getText())
-        return
-
-    # Visit a parse tree produced by ShellParser#double_quoted.
-    def visitDouble_quoted(self, ctx: ShellParser.Double_quotedContext):
-        # Check for and evaluate nested backquotes.
-        if "`" in ctx.getText():
-            self.eval_nested_backquotes(ctx.getText())
-
-        # Add the double quoted text to the tree.
-        else:
-            self.tree[self.command_index].append(ctx.getText()
-                                                 .replace('"', ""))
-        return
-
-    def visitTerminal(self, ctx):
-        return self.tree
+from antlr4.tree.Tree import TerminalNode
+from grammar.ShellVisitor import ShellVisitor
+from grammar.ShellParser import ShellParser
+from command import Pipe, Call, Seq
+from parse import parse
+
+
+# Inherits from ShellVisitor.
+# Utilises visitor methods to walk through the parse tree and return a
+# command object.
+
+
+class Converter(ShellVisitor):
+
+    # Visit a parse tree produced by ShellParser#command.
+    def visitCommand(self, ctx: ShellParser.CommandContext):
+        # Return the Pipe or Call object of a single command, or None if
+        # the command is empty after a syntax error.
+        if ctx.pipe():
+            return self.visit(ctx.pipe())
+        elif ctx.call():
+            return self.visit(ctx.call())
+        elif not ctx.command():
+            return None
+
+        # Sequences are nested on the left, so walk down the left operands
+        # and collect the commands into a single Seq object.
+        operands = []
+        while ctx.command():
+            operands.extend(reversed(ctx.command()[1:]))
+            ctx = ctx.command(0)
+        operands.append(ctx)
+
+        commands = []
+        for operand in reversed(operands):
+            command = self.visit(operand)
+            if isinstance(command, Seq):
+                commands.extend(command.commands)
+            elif command is not None:
+                commands.append(command)
+        return Seq(commands)
+
+    # Visit a parse tree produced by ShellParser#pipe.
+    def visitPipe(self, ctx: ShellParser.PipeContext):
+        # Pipes are nested on the left as well.
+        calls = []
+        while ctx is not None:
+            calls.extend(reversed(ctx.call()))
+            ctx = ctx.pipe()
+
+        calls = [self.visit(call) for call in reversed(calls)]
+        calls = [call for call in calls if call is not None]
+        return Pipe(calls) if len(calls) > 1 else calls[0]
+
+    # Visit a parse tree produced by ShellParser#call and return the Call.
+    def visitCall(self, ctx: ShellParser.CallContext):
+        # The first argument outside a redirection is the application.
+        # Other arguments belong to the application or to the redirection
+        # before them.
+        app = None
+        args = []
+        redirections = []
+        current = args
+        for child in ctx.getChildren():
+            if isinstance(child, ShellParser.AtomContext):
+                child = child.getChild(0)
+
+            if isinstance(child, ShellParser.RedirectionContext):
+                operator, files = self.visitRedirection(child)
+                current = files
+                redirections.append((operator, files))
+            elif isinstance(child, ShellParser.ArgumentContext):
+                for word in self.visitArgument(child):
+                    if app is None:
+                        app = word
+                        current = args
+                    else:
+                        current.append(word)
+
+        if app is None and len(redirections) == 0:
+            return None
+        return Call(app, args, redirections)
+
+    # Visit a parse tree produced by ShellParser#atom.
+    def visitAtom(self, ctx: ShellParser.AtomContext):
+        return self.visitChildren(ctx)
+
+    # Visit a parse tree produced by ShellParser#argument.
+    # Returns the list of words in the argument.
+    def visitArgument(self, ctx: ShellParser.ArgumentContext):
+        return [self.visit(child) for child in ctx.getChildren()
+                if not isinstance(child, TerminalNode)]
+
+    # Visit a parse tree produced by ShellParser#redirection.
+    # Returns the operator and the list of files.
+    def visitRedirection(self, ctx: ShellParser.RedirectionContext):
+        if ctx.getText()[0:2] == ">>":
+            operator = ">>"
+        else:
+            operator = ctx.getText()[0]
+        return operator, self.visitArgument(ctx.argument())
+
+    # Visit a parse tree produced by ShellParser#unquoted.
+    def visitUnquoted(self, ctx: ShellParser.UnquotedContext):
+        return ctx.getText()
+
+    # Visit a parse tree produced by ShellParser#quoted.
+    def visitQuoted(self, ctx: ShellParser.QuotedContext):
+        return self.visit(ctx.getChild(0))
+
+    # Visit a parse tree produced by ShellParser#single_quoted.
+    def visitSingle_quoted(self, ctx: ShellParser.Single_quotedContext):
+        return ctx.getText()
+
+    # Completes command substitution on backquoted text
+    def eval_nested_backquotes(self, text):
+        # Find the indexes of the backquotes in the string.
+        backquotes_index = [pos for pos, char in enumerate(text)
+                            if char == "`"]
+
+        # Isolate the command in backquotes.
+        command = text[backquotes_index[0] + 1: backquotes_index[1]]
+
+        # Adds the text on either side of the backquotes and the parsed command
+        # to the output.
+        out = [text[: backquotes_index[0]]]
+        parse(command, out, Converter())
+        out[-1] = out[-1][:-1]
+        out.append(text[backquotes_index[1] + 1:])
+
+        return "".join(out)
+
+    # Visit a parse tree produced by ShellParser#backquoted.
+    def visitBackquoted(self, ctx: ShellParser.BackquotedContext):
+        return self.eval_nested_backquotes(ctx.getText())
+
+    # Visit a parse tree produced by ShellParser#double_quoted.
+    def visitDouble_quoted(self, ctx: ShellParser.Double_quotedContext):
+        # Check for and evaluate nested backquotes.
+        if "`" in ctx.getText():
+            return self.eval_nested_backquotes(ctx.getText())
+
+        # Return the double quoted text without the quotes.
+        else:
+            return ctx.getText().replace('"', "")
@@ -0,0 +1,86 @@
+import re
+from command import Pipe, Seq, Call
+
+# Tokens of the quote-free subset of Shell.g4: runs of spaces, words and
+# the ';', '|', '<', '>' and '>>' operators.
+TOKEN = re.compile(r"[ \t]+|[^ \t\r\n\"'`;|<>]+|>>|[;|<>]")
+
+# Characters the fast path leaves to the ANTLR parser.
+UNSUPPORTED = re.compile(r"[\"'`\r\n]")
+
+REDIRECTIONS = ("<", ">", ">>")
+
+
+def is_word(token):
+    return token not in REDIRECTIONS and token not in (";", "|") \
+        and not token.isspace()
+
+
+# Split the tokens on the separator, returning the list of token lists.
+def split(tokens, separator):
+    parts = [[]]
+    for token in tokens:
+        if token == separator:
+            parts.append([])
+        else:
+            parts[-1].append(token)
+    return parts
+
+
+# Convert a simple command line to the same Command object the Converter
+# builds from the ANTLR parse tree, without running the parser.
+# Returns None for any line outside the handled subset so that the caller
+# falls back to the full parser.
+def fast_convert(s):
+    if UNSUPPORTED.search(s):
+        return None
+
+    commands = []
+    for sequence in split(TOKEN.findall(s), ";"):
+        calls = []
+        for tokens in split(sequence, "|"):
+            call = convert_call(tokens)
+            if call is None:
+                return None
+            calls.append(call)
+        commands.append(Pipe(calls) if len(calls) > 1 else calls[0])
+
+    return Seq(commands) if len(commands) > 1 else commands[0]
+
+
+# Convert the tokens of a single call, following Converter.visitCall.
+# Returns None if the call is empty or would need the parser's error
+# recovery.
+def convert_call(tokens):
+    app = None
+    args = []
+    redirections = []
+    current = args
+    prev = None
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token in REDIRECTIONS:
+            # A redirection has to be separated from the previous atom and
+            # followed by its file name.
+            if prev is not None and not prev.isspace():
+                return None
+            i += 1
+            if i < len(tokens) and tokens[i].isspace():
+                i += 1
+            if i == len(tokens) or not is_word(tokens[i]):
+                return None
+            current = [tokens[i]]
+            redirections.append((token, current))
+        elif is_word(token):
+            if app is None:
+                app = token
+                current = args
+            else:
+                current.append(token)
+        prev = tokens[i]
+        i += 1
+
+    if app is None:
+        return None
+    return Call(app, args, redirections)
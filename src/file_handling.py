@@ -1,21 +1,311 @@
-
-# Open and read the file. Return the lines as a list.
-def open_file(file):
-    try:
-        f = open(file, "r")
-    except FileNotFoundError:
-        raise FileNotFoundError
-    else:
-        f.seek(0)
-        lines = f.readlines()
-        f.close()
-        return lines
-
-
-# Create a new file and write to the file the list of lines.
-def make_file(file, lines=None):
-    f = open(file, "w")
-    if lines:
-        f.writelines(lines)
-    f.seek(0)
-    f.close()
+import io
+import mmap
+import os
+import stat
+import sys
+import threading
+import weakref
+from array import array
+from collections import deque, namedtuple
+from collections.abc import Sequence
+from lru_cache import LRUCache
+
+# Number of bytes decoded at a time when iterating over a LineView, and
+# the size of the first block.
+BLOCK_SIZE = 1 << 20
+FIRST_BLOCK_SIZE = 1 << 12
+
+# Number of bytes read at a time from the end of a file by tail.
+TAIL_BLOCK_SIZE = 1 << 16
+
+# LineViews still mapping their files, so that they can be detached before
+# one of the files is overwritten.
+views = weakref.WeakValueDictionary()
+
+
+# A read-only list of the lines of a text file, backed by a memory map of
+# the file. Lines end at "\n", and "\r\n" is read as "\n". Nothing is
+# decoded until a line is asked for: the offsets of the lines are indexed
+# only as far as the largest index used, and iterating decodes the file a
+# block at a time without indexing it.
+class LineView(Sequence):
+    def __init__(self, file, encoding="utf-8"):
+        self.path = os.path.realpath(file)
+        self.encoding = encoding
+        with open(file, "rb") as f:
+            try:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files cannot be mapped.
+                self.data = b""
+        self.lock = threading.Lock()
+        self.starts = array("q", [0])
+        self.complete = len(self.data) == 0
+        self.count = None
+        views[id(self)] = self
+
+    def __len__(self):
+        if self.count is None:
+            if self.complete:
+                self.count = len(self.starts) - 1
+            else:
+                data = self.data
+                count = sum(data[i:i + BLOCK_SIZE].count(b"\n")
+                            for i in range(0, len(data), BLOCK_SIZE))
+                if data[-1:] != b"\n":
+                    count += 1
+                self.count = count
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        self.scan(index + 1)
+        if index < 0 or index + 1 >= len(self.starts):
+            raise IndexError("line index out of range")
+        return self.decode(self.data[self.starts[index]:
+                                     self.starts[index + 1]])
+
+    def __iter__(self):
+        return self.iter_from(0)
+
+    # Yield the lines from the byte offset start, which has to be the start
+    # of a line. The data is looked up again for every block, as the view
+    # may be detached while it is being iterated; the lock keeps detach()
+    # from closing the map while a block is copied out of it.
+    def iter_from(self, start):
+        end = len(self.data)
+        # Blocks start small, so that the first lines come quickly, and
+        # grow up to BLOCK_SIZE.
+        block_size = FIRST_BLOCK_SIZE
+        while start < end:
+            with self.lock:
+                data = self.data
+                # Decode whole lines only, so that no character is split.
+                stop = end
+                if start + block_size < end:
+                    stop = data.rfind(b"\n", start, start + block_size) + 1
+                    if stop <= start:
+                        stop = data.find(b"\n", start + block_size) + 1 \
+                            or end
+                block = data[start:stop]
+            yield from decode_lines(block, self.encoding)
+            start = stop
+            block_size = min(block_size * 2, BLOCK_SIZE)
+
+    def __eq__(self, other):
+        if isinstance(other, (list, LineView)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    # Index the offsets of the lines until count lines are known or the end
+    # of the file is reached.
+    def scan(self, count):
+        data = self.data
+        starts = self.starts
+        end = len(data)
+        start = starts[-1]
+        while len(starts) <= count and start < end:
+            start = data.find(b"\n", start) + 1 or end
+            starts.append(start)
+        if start >= end:
+            self.complete = True
+
+    def decode(self, data):
+        return data.decode(self.encoding).replace("\r\n", "\n")
+
+    # Copy the contents of the file into memory and release the map, so
+    # that the file can be changed without affecting the lines.
+    def detach(self):
+        with self.lock:
+            if isinstance(self.data, mmap.mmap):
+                data = self.data
+                self.data = data[:]
+                data.close()
+        views.pop(id(self), None)
+
+    def close(self):
+        with self.lock:
+            if isinstance(self.data, mmap.mmap):
+                self.data.close()
+            self.data = b""
+        views.pop(id(self), None)
+
+
+# Decode whole lines of a file and split them the way LineView does,
+# keeping the "\n" at their ends. str.splitlines() is faster, but also
+# splits at other line breaks.
+def decode_lines(data, encoding="utf-8"):
+    text = data.decode(encoding)
+    if "\r" in text:
+        text = text.replace("\r\n", "\n")
+    lines = text.splitlines(True)
+    # Every line but the last ends with "\n" unless it was split at
+    # another line break.
+    if len(lines) - text.count("\n") > (not text.endswith("\n")):
+        return list(io.StringIO(text, newline="\n"))
+    return lines
+
+
+# Detach the LineViews of the file before it is overwritten.
+def detach_views(file):
+    path = os.path.realpath(file)
+    for view in list(views.values()):
+        if view.path == path:
+            view.detach()
+
+
+# The lines of a file read in this session, the (st_mtime_ns, st_size,
+# st_ino) of the file when they were read, and the bytes of memory the
+# lines take.
+CachedFile = namedtuple("CachedFile", ["stamp", "lines", "size"])
+
+
+def cached_file_size(cached):
+    return cached.size
+
+
+# Return the bytes of memory taken by a tuple of lines. Each str has an
+# object header, so short lines take several times their length.
+def lines_size(lines):
+    return sys.getsizeof(lines) + sum(map(sys.getsizeof, lines))
+
+
+# Total bytes of memory taken by the lines kept in the file cache.
+FILE_CACHE_SIZE = 64 << 20
+
+# Cached files keyed by their real path. Files are evicted when the memory
+# taken by their lines is over FILE_CACHE_SIZE, least recently used first.
+file_cache = LRUCache(FILE_CACHE_SIZE, cached_file_size)
+file_cache_lock = threading.Lock()
+
+
+def set_file_cache_size(size):
+    with file_cache_lock:
+        file_cache.resize(size)
+
+
+# Return the real path and stamp of the file, and its cached lines if they
+# are still up to date, otherwise None.
+def lookup_file(file):
+    path = os.path.realpath(file)
+    st = os.stat(file)
+    stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+    with file_cache_lock:
+        cached = file_cache.get(path)
+        if cached is not None and cached.stamp != stamp:
+            file_cache.pop(path)
+            cached = None
+    if cached is None:
+        return path, stamp, None
+    return path, stamp, cached.lines
+
+
+# Cache the lines of the file unless they take more memory than the whole
+# cache.
+def cache_file(path, stamp, lines):
+    lines = tuple(lines)
+    size = lines_size(lines)
+    with file_cache_lock:
+        if size <= file_cache.maxsize:
+            file_cache.put(path, CachedFile(stamp, lines, size))
+
+
+# Forget the cached lines of a file the shell writes to or removes.
+def invalidate_file(file):
+    with file_cache_lock:
+        file_cache.pop(os.path.realpath(file))
+
+
+# Return the lines of the file as a list. Files larger than the file cache
+# are returned as a LineView instead; their lines would take even more
+# memory than their bytes.
+def open_file(file):
+    path, stamp, lines = lookup_file(file)
+    if lines is None:
+        view = LineView(file)
+        if stamp[1] > file_cache.maxsize:
+            return view
+        lines = list(view)
+        view.close()
+        cache_file(path, stamp, lines)
+        return lines
+    return list(lines)
+
+
+# Yield the lines of the file one at a time. The lines are cached once the
+# whole file has been read.
+def iter_file(file):
+    path, stamp, lines = lookup_file(file)
+    if lines is not None:
+        yield from lines
+        return
+
+    view = LineView(file)
+    try:
+        if stamp[1] > file_cache.maxsize:
+            yield from view
+            return
+        lines = []
+        for line in view:
+            lines.append(line)
+            yield line
+    finally:
+        view.close()
+    cache_file(path, stamp, lines)
+
+
+# Return the last count lines of the file. Regular files are read in blocks
+# from the end until enough lines have been found, so only the end of the
+# file is read.
+def read_last_lines(file, count):
+    path, stamp, lines = lookup_file(file)
+    if count <= 0:
+        return []
+    if lines is not None:
+        return list(lines[-count:])
+
+    with open(file, "rb") as f:
+        if not stat.S_ISREG(os.fstat(f.fileno()).st_mode):
+            # Pipes and devices cannot be read from the end, so they are
+            # read a line at a time, keeping only the last count lines.
+            text = io.TextIOWrapper(f, encoding="utf-8", newline="\n")
+            last = deque(text, maxlen=count)
+            text.detach()
+            return [line[:-2] + "\n" if line.endswith("\r\n") else line
+                    for line in last]
+
+        end = f.seek(0, os.SEEK_END)
+        start = end
+        blocks = []
+        newlines = 0
+        while start > 0 and newlines < count:
+            block_size = min(TAIL_BLOCK_SIZE, start)
+            start -= block_size
+            f.seek(start)
+            block = f.read(block_size)
+            # The newline ending the file does not start another line.
+            if start + block_size == end:
+                newlines += block.count(b"\n", 0, block_size - 1)
+            else:
+                newlines += block.count(b"\n")
+            blocks.append(block)
+
+    data = b"".join(reversed(blocks))
+    if start > 0:
+        # Drop the part of the first line before the blocks.
+        data = data[data.index(b"\n") + 1:]
+    return decode_lines(data)[-count:]
+
+
+# Create a new file and write to the file the list of lines.
+def make_file(file, lines=None):
+    detach_views(file)
+    invalidate_file(file)
+    f = open(file, "w")
+    if lines:
+        f.writelines(lines)
+    f.seek(0)
+    f.close()
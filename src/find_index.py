@@ -0,0 +1,145 @@
+# Persistent index of directory trees for find, like locate's database.
+
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+# Directory the indexes are stored in, one file per indexed tree.
+INDEX_DIRECTORY = os.path.join(
+    os.environ.get("XDG_CACHE_HOME")
+    or os.path.join(os.path.expanduser("~"), ".cache"), "comp0010-shell")
+
+# Changed when the format of the index files changes; older files are
+# ignored.
+INDEX_VERSION = 1
+
+# A directory changed this close to the time it was scanned may change
+# again without its mtime changing, so its mtime is not trusted and it is
+# scanned again next time.
+RACY_TIME_NS = 2 * 10 ** 9
+
+# The kinds of directory entries, in the order they are kept in: regular
+# files, other files, directories and symbolic links to directories, which
+# are not walked.
+FILE, OTHER, DIRECTORY, LINK = range(4)
+
+
+def set_index_directory(directory):
+    global INDEX_DIRECTORY
+    INDEX_DIRECTORY = directory
+
+
+def index_file(root):
+    digest = hashlib.sha1(os.path.realpath(root).encode()).hexdigest()
+    return os.path.join(INDEX_DIRECTORY, digest + ".index")
+
+
+# The entries of the directories of a tree, keyed by their paths relative
+# to the root, "" for the root itself. Each directory has its st_mtime_ns
+# when it was scanned, or None if that cannot be trusted, and for each kind
+# of entry the sorted names joined with "\0", so that they are stored and
+# loaded compactly.
+class FileIndex:
+    def __init__(self, root, directories=None):
+        self.root = os.path.realpath(root)
+        self.directories = {} if directories is None else directories
+        self.changed = False
+
+    # Return a list of the names of the entries of the directory for each
+    # kind. They are taken from the index if the mtime of the directory has
+    # not changed since it was scanned, otherwise it is scanned again.
+    def entries(self, directory):
+        path = os.path.join(self.root, directory)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = None
+        indexed = self.directories.get(directory)
+        if indexed is not None and mtime is not None and indexed[0] == mtime:
+            names = indexed[1:]
+        else:
+            started = time.time_ns()
+            names = scan_directory(path)
+            if mtime is not None and mtime > started - RACY_TIME_NS:
+                mtime = None
+            self.directories[directory] = (mtime,) + names
+            self.changed = True
+        return [group.split("\0") if group else [] for group in names]
+
+    # Yield each directory of the tree up to max_depth - 1 levels below
+    # the root with the names of its entries, the entries of a directory
+    # before its subdirectories.
+    def walk(self, max_depth=sys.maxsize):
+        seen = set()
+        stack = [("", 0)]
+        while len(stack) > 0:
+            directory, depth = stack.pop()
+            seen.add(directory)
+            entries = self.entries(directory)
+            yield directory, entries
+            if depth + 1 < max_depth:
+                stack.extend((os.path.join(directory, name), depth + 1)
+                             for name in reversed(entries[DIRECTORY]))
+        if max_depth == sys.maxsize:
+            # Forget the directories that are gone from the tree.
+            for directory in set(self.directories) - seen:
+                del self.directories[directory]
+                self.changed = True
+
+    # Write the index to a temporary file first, so that a query reading
+    # it at the same time sees the old or the new index, never a part.
+    def save(self):
+        os.makedirs(INDEX_DIRECTORY, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=INDEX_DIRECTORY,
+                                         delete=False) as f:
+            pickle.dump((INDEX_VERSION, self.root, self.directories), f,
+                        pickle.HIGHEST_PROTOCOL)
+        os.replace(f.name, index_file(self.root))
+        self.changed = False
+
+
+# Return the sorted names of the entries of the directory of each kind,
+# joined with "\0". Unreadable directories have no entries.
+def scan_directory(path):
+    names = ([], [], [], [])
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        kind = LINK if entry.is_symlink() else DIRECTORY
+                    else:
+                        kind = FILE if entry.is_file() else OTHER
+                except OSError:
+                    kind = OTHER
+                names[kind].append(entry.name)
+    except OSError:
+        pass
+    return tuple("\0".join(sorted(group)) for group in names)
+
+
+# Return the index of the tree at root, or None if it has not been indexed.
+def load_index(root):
+    try:
+        with open(index_file(root), "rb") as f:
+            version, indexed_root, directories = pickle.load(f)
+    except (OSError, EOFError, TypeError, ValueError,
+            pickle.UnpicklingError):
+        return None
+    if version != INDEX_VERSION:
+        return None
+    return FileIndex(indexed_root, directories)
+
+
+# Scan the whole tree at root and save a new index of it.
+def build_index(root):
+    if not os.path.isdir(root):
+        raise ValueError(f"{root} is not a directory")
+    index = FileIndex(root)
+    for _ in index.walk():
+        pass
+    index.save()
+    return index
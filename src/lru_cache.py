@@ -0,0 +1,86 @@
+from collections import OrderedDict, namedtuple
+
+CacheInfo = namedtuple("CacheInfo",
+                       ["hits", "misses", "evictions", "maxsize", "currsize"])
+
+
+# Each entry counts as one towards the size of a cache without a weight.
+def count_one(value):
+    return 1
+
+
+# Bounded least-recently-used mapping.
+# Keeps hit, miss and eviction counters so the size can be tuned.
+# If weight is given, the size of the cache is the sum of weight(value)
+# over its values instead of the number of entries.
+class LRUCache:
+    def __init__(self, maxsize=128, weight=None):
+        if maxsize < 0:
+            raise ValueError("cache size cannot be negative")
+        self.maxsize = maxsize
+        self.weight = weight or count_one
+        self.size = 0
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    # Return the cached value and mark it as most recently used,
+    # or default if the key is not cached.
+    def get(self, key, default=None):
+        try:
+            value = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    # Insert or replace a value, evicting the least recently used entries
+    # when the cache is over its size.
+    def put(self, key, value):
+        if self.maxsize == 0:
+            return
+        self.pop(key)
+        self.entries[key] = value
+        self.size += self.weight(value)
+        self.evict()
+
+    def pop(self, key, default=None):
+        if key not in self.entries:
+            return default
+        value = self.entries.pop(key)
+        self.size -= self.weight(value)
+        return value
+
+    # Change the maximum size, evicting entries if the cache shrinks.
+    def resize(self, maxsize):
+        if maxsize < 0:
+            raise ValueError("cache size cannot be negative")
+        self.maxsize = maxsize
+        self.evict()
+
+    def evict(self):
+        while self.size > self.maxsize:
+            key, value = self.entries.popitem(last=False)
+            self.size -= self.weight(value)
+            self.evictions += 1
+
+    # Remove all entries and reset the counters.
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.evictions,
+                         self.maxsize, self.size)
@@ -1,29 +1,82 @@
-from antlr4 import InputStream, CommonTokenStream
-from grammar.ShellLexer import ShellLexer
-from grammar.ShellParser import ShellParser
-from collections import deque
-
-
-# Create a parse tree. Using visitors to traverse the tree.
-def parse(s, output, visitor):
-
-    input_stream = InputStream(s)
-    lexer = ShellLexer(input_stream)
-    stream = CommonTokenStream(lexer)
-    parser = ShellParser(stream)
-    tree = parser.command()
-
-    # Visitors return the Command object.
-    try:
-        command = tree.accept(visitor)
-    except IndexError:
-        raise ValueError("unsupported application: "
-                         "could not parse command line")
-
-    input = deque()
-
-    # Call eval() of corresponding Command object.
-    final_output = deque()
-    for cmd in command:
-        cmd.eval(input, final_output)
-        output.extend(final_output)
+from antlr4 import InputStream, CommonTokenStream, PredictionMode, \
+    BailErrorStrategy
+from antlr4.error.Errors import ParseCancellationException
+from grammar.ShellLexer import ShellLexer
+from grammar.ShellParser import ShellParser
+from lru_cache import LRUCache
+from fast_parse import fast_convert
+
+PLAN_CACHE_SIZE = 256
+
+# Converted command plans keyed by the raw command line.
+plan_cache = LRUCache(PLAN_CACHE_SIZE)
+NOT_CACHED = object()
+
+
+# Change the number of command lines kept in the plan cache.
+def set_plan_cache_size(size):
+    plan_cache.resize(size)
+
+
+# Build the parse tree of the command line.
+# SLL prediction is tried first and gives up at the first syntax error;
+# only then is the line parsed again with full LL prediction, which also
+# reports the error and recovers from it.
+def parse_tree(s):
+    input_stream = InputStream(s)
+    lexer = ShellLexer(input_stream)
+    stream = CommonTokenStream(lexer)
+    parser = ShellParser(stream)
+    parser._interp.predictionMode = PredictionMode.SLL
+    parser._errHandler = BailErrorStrategy()
+    parser.removeErrorListeners()
+    try:
+        return parser.command()
+    except ParseCancellationException:
+        # The tokens are kept by the stream, so only the parser is rebuilt.
+        stream.seek(0)
+        parser = ShellParser(stream)
+        parser._interp.predictionMode = PredictionMode.LL
+        return parser.command()
+
+
+# Parse the command line and walk the tree with the visitor.
+# Returns the Command object, or None for an empty line.
+def convert(s, visitor):
+    tree = parse_tree(s)
+
+    # Visitors return the Command object.
+    try:
+        return tree.accept(visitor)
+    except IndexError:
+        raise ValueError("unsupported application: "
+                         "could not parse command line")
+
+
+# Return the Command object for the command line. Commands are not changed
+# by eval(), so the converted command is cached and reused when the same
+# line is seen again.
+def get_command(s, visitor):
+    # Backquotes are substituted while converting, so their result
+    # depends on the state of the shell and cannot be reused.
+    if "`" in s:
+        return convert(s, visitor)
+
+    command = plan_cache.get(s, NOT_CACHED)
+    if command is NOT_CACHED:
+        # Simple lines are converted by the fast path, anything else by
+        # the ANTLR parser.
+        command = fast_convert(s)
+        if command is None:
+            command = convert(s, visitor)
+        plan_cache.put(s, command)
+    return command
+
+
+# Create a parse tree. Using visitors to traverse the tree.
+def parse(s, output, visitor):
+    command = get_command(s, visitor)
+
+    # Call eval() of corresponding Command object.
+    if command is not None:
+        command.eval([], output)
@@ -0,0 +1,213 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from multiprocessing import get_context
+from queue import Queue, Empty, Full
+from streams import close
+
+# Number of lines sent between threads at a time and the number of batches
+# a queue holds before the producing call has to wait.
+BATCH_SIZE = 256
+QUEUE_SIZE = 16
+
+# Number of worker processes for CPU-bound calls, and the number of stdin
+# lines sent to a worker process at a time.
+PROCESS_WORKERS = os.cpu_count() or 1
+PROCESS_BATCH_SIZE = 4096
+
+# Seconds between checks for a stopped pipe while waiting on a queue.
+POLL_INTERVAL = 0.05
+
+# Put on a queue after the last batch of lines.
+DONE = object()
+
+
+# An exception raised by a call, passed on to the calls after it.
+class StageError:
+    __slots__ = ("exception",)
+
+    def __init__(self, exception):
+        self.exception = exception
+
+
+# A bounded queue of line batches from one call to the next.
+class Channel:
+    def __init__(self, size):
+        self.queue = Queue(size)
+        self.stopped = threading.Event()
+
+    # Wait until there is room for the item.
+    # Returns False if the reading call has stopped.
+    def put(self, item):
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=POLL_INTERVAL)
+                return True
+            except Full:
+                pass
+        return False
+
+    def get(self):
+        while True:
+            try:
+                return self.queue.get(timeout=POLL_INTERVAL)
+            except Empty:
+                if self.stopped.is_set():
+                    return DONE
+
+    def stop(self):
+        self.stopped.set()
+
+    # Yield the lines of each batch. Exceptions of the writing call are
+    # raised again in the reading call. Closing the iterator tells the
+    # writing call to stop.
+    def lines(self):
+        try:
+            while True:
+                item = self.get()
+                if item is DONE:
+                    return
+                if isinstance(item, StageError):
+                    raise item.exception
+                yield from item
+        finally:
+            self.stop()
+
+
+# Run the call in its own thread, sending its output to the channel in
+# batches.
+def run_stage(call, input, channel, batch_size, processes):
+    lines = None
+    try:
+        lines = call.stream(input, processes)
+        batch = []
+        for line in lines:
+            batch.append(line)
+            if len(batch) >= batch_size:
+                if not channel.put(batch):
+                    return
+                batch = []
+        if batch and not channel.put(batch):
+            return
+        channel.put(DONE)
+    except Exception as e:
+        channel.put(StageError(e))
+    finally:
+        close(lines)
+        close(input)
+
+
+# Run each call of a pipe in a worker thread, connected by bounded queues.
+# The output of the last call is appended to output in order, and the first
+# exception that reaches the end of the pipe is raised.
+# If processes is True, CPU-bound applications run in the process pool.
+def run_threaded(calls, input, output, batch_size=BATCH_SIZE,
+                 queue_size=QUEUE_SIZE, processes=False):
+    channels = []
+    threads = []
+    lines = input
+    for call in calls:
+        channel = Channel(queue_size)
+        threads.append(threading.Thread(
+            target=run_stage,
+            args=(call, lines, channel, batch_size, processes),
+            daemon=True))
+        channels.append(channel)
+        lines = channel.lines()
+
+    for thread in threads:
+        thread.start()
+    try:
+        output.extend(lines)
+    finally:
+        # Stop any call still running, then wait for all of them to finish.
+        close(lines)
+        for channel in channels:
+            channel.stop()
+        for thread in threads:
+            thread.join()
+
+
+# The pool of worker processes is started the first time it is needed and
+# reused for the rest of the session.
+process_pool = None
+
+
+def get_process_pool():
+    global process_pool
+    if process_pool is None:
+        process_pool = ProcessPoolExecutor(PROCESS_WORKERS,
+                                           mp_context=get_context("spawn"))
+    return process_pool
+
+
+def shutdown_process_pool():
+    global process_pool
+    if process_pool is not None:
+        process_pool.shutdown()
+        process_pool = None
+
+
+# Run the application in a worker process and return its output lines.
+def run_application(application, args, cwd):
+    os.chdir(cwd)
+    output = deque()
+    application.exec(args, output)
+    return list(output)
+
+
+def batches(lines, size):
+    iterator = iter(lines)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+# Yield the output of the application computed in the process pool.
+# The arguments and stdin lines are pickled and sent to the workers.
+def stream_in_processes(application, args, batch_size=PROCESS_BATCH_SIZE):
+    pool = get_process_pool()
+    cwd = os.getcwd()
+    stdin = None
+    if len(args) > 0 and not isinstance(args[-1], str):
+        stdin = args.pop()
+
+    if stdin is None or not application.splits_stdin:
+        if stdin is not None:
+            args.append(list(stdin))
+        yield from pool.submit(run_application, application, args,
+                               cwd).result()
+        return
+
+    # Each line of stdin gives its output independently, so batches of
+    # lines are spread over the workers and their output yielded in order.
+    pending = deque()
+    try:
+        for batch in batches(stdin, batch_size):
+            pending.append(pool.submit(run_application, application,
+                                       args + [batch], cwd))
+            if len(pending) >= 2 * PROCESS_WORKERS:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+        close(stdin)
+
+
+# Runs the application in the process pool when streamed. Only the wrapped
+# application is sent to the workers, so an UnsafeDecorator around this
+# prints its messages in the shell process, with the rest of the output.
+class ProcessApplication:
+    def __init__(self, app):
+        self.app = app
+        self.cpu_bound = app.cpu_bound
+        self.splits_stdin = app.splits_stdin
+
+    def stream(self, args):
+        return stream_in_processes(self.app, args)
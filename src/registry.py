@@ -0,0 +1,95 @@
+from collections import namedtuple
+from application import Echo, Cd, Pwd, Ls, Cat, Head, Tail, Grep, \
+    Uniq, Sort, Cut, Find, Rm, Mkdir, Wc, Index
+
+# An application class, the function validating its arguments and whether
+# it is the safe variant.
+Registration = namedtuple("Registration", ["application", "validator", "safe"])
+
+# Registered applications keyed by name, including the "_" unsafe variants.
+applications = {}
+
+
+# Register an application under its name and the name of its unsafe
+# variant. The validator is called with the argument list before the
+# application is run, and may raise ValueError or fill in default arguments.
+def register(name, application, validator=None):
+    if validator is None:
+        validator = no_check
+    applications[name] = Registration(application, validator, True)
+    applications["_" + name] = Registration(application, validator, False)
+
+
+def unregister(name):
+    applications.pop(name, None)
+    applications.pop("_" + name, None)
+
+
+# Return the Registration of the application with the given name.
+def lookup(name):
+    try:
+        return applications[name]
+    except KeyError:
+        raise ValueError(f"unsupported application {name}")
+
+
+# Validators:
+
+
+def no_check(args):
+    pass
+
+
+# Returns a validator checking if the correct amount of arguments has been
+# provided to an app. Considers if the application is allowed unlimited args.
+def check_arguments(num_of_arguments, limited_args=True):
+    def validator(args):
+        if ((len(args) in num_of_arguments and not limited_args)
+                or (len(args) not in num_of_arguments and limited_args)):
+            raise ValueError("wrong number of command line arguments")
+    return validator
+
+
+# The expressions find accepts, each followed by its argument.
+FIND_EXPRESSIONS = ("-name", "-maxdepth", "-type")
+
+
+# Piped stdin is ignored by find, so only the words of the command line are
+# checked.
+def check_find_arguments(args):
+    words = [arg for arg in args if isinstance(arg, str)]
+    for i in words:
+        if i.startswith('-') and i not in FIND_EXPRESSIONS:
+            raise ValueError("wrong flag used")
+    start = 1 if len(words) > 0 and not words[0].startswith('-') else 0
+    for i in range(start, len(words), 2):
+        if not words[i].startswith('-'):
+            raise ValueError("paths must precede expression")
+        elif i + 1 == len(words):
+            raise ValueError(f"missing argument to '{words[i]}'")
+    if "-maxdepth" in words and \
+            not words[words.index("-maxdepth") + 1].isdigit():
+        raise ValueError("-maxdepth needs a non-negative number")
+    if "-type" in words and \
+            words[words.index("-type") + 1] not in ("f", "d"):
+        raise ValueError("-type needs f or d")
+    if len(args) == 0:
+        args.append(".")
+
+
+register("head", Head, check_arguments([1, 3]))
+register("tail", Tail, check_arguments([1, 3]))
+register("uniq", Uniq, check_arguments([0], False))
+register("sort", Sort, check_arguments([1, 2]))
+register("pwd", Pwd)
+register("cd", Cd, check_arguments([1]))
+register("echo", Echo)
+register("ls", Ls, check_arguments([0, 1]))
+register("cat", Cat)
+register("grep", Grep, check_arguments([0, 1], False))
+register("cut", Cut, check_arguments([3, 5]))
+register("rm", Rm, check_arguments([0], False))
+register("mkdir", Mkdir, check_arguments([0], False))
+register("wc", Wc, check_arguments([0], False))
+register("find", Find, check_find_arguments)
+register("index", Index)
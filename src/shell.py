@@ -1,8 +1,9 @@
 import os
 import sys
-from collections import deque
+from contextlib import redirect_stdout
 from converter import Converter
 from parse import parse
+from writer import OutputWriter
 
 
 def eval(s, out):
@@ -10,22 +11,27 @@ def eval(s, out):
     parse(s, out, Converter())
 
 
+# Evaluate the command line, writing its output to stdout as it is
+# produced. Messages printed while it runs go through the same writer.
+def run(s, writer):
+    try:
+        with redirect_stdout(writer):
+            eval(s, writer)
+    finally:
+        writer.flush()
+
+
 if __name__ == "__main__":
     args_num = len(sys.argv) - 1
+    writer = OutputWriter(sys.stdout.buffer)
     if args_num > 0:
         if args_num != 2:
             raise ValueError("wrong number of command line arguments")
         if sys.argv[1] != "-c":
             raise ValueError(f"unexpected command line argument {sys.argv[1]}")
-        out = deque()
-        eval(sys.argv[2], out)
-        while len(out) > 0:
-            print(out.popleft(), end="")
+        run(sys.argv[2], writer)
     else:
         while True:
-            print(os.getcwd() + "> ", end="")
+            print(os.getcwd() + "> ", end="", flush=True)
             cmdline = input()
-            out = deque()
-            eval(cmdline, out)
-            while len(out) > 0:
-                print(out.popleft(), end="")
+            run(cmdline, writer)
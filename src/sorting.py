@@ -0,0 +1,106 @@
+import heapq
+import pickle
+import sys
+import tempfile
+from itertools import chain
+from multiprocessing import parent_process
+from pipeline import get_process_pool
+
+# Number of bytes of lines sort keeps in memory. Larger inputs are sorted
+# in runs of this size that are written to temporary files and merged.
+SORT_MEMORY_SIZE = 64 << 20
+
+# Number of lines written to or read from a run file at a time.
+RUN_BATCH_SIZE = 1024
+
+
+def set_sort_memory_size(size):
+    global SORT_MEMORY_SIZE
+    if size < 1:
+        raise ValueError("sort needs a positive memory size")
+    SORT_MEMORY_SIZE = size
+
+
+# Number of processes sorting a run in parallel, and the number of lines
+# below which a run is sorted in this process. Sorting in parallel is off
+# by default: the chunks are pickled to the workers and back, and the
+# pool takes a few hundred milliseconds to start, so it has not been seen
+# to pay off. set_sort_workers() turns it on.
+SORT_WORKERS = 1
+PARALLEL_SORT_THRESHOLD = 200000
+
+
+def set_sort_workers(workers):
+    global SORT_WORKERS
+    if workers < 1:
+        raise ValueError("sort needs at least one worker")
+    SORT_WORKERS = workers
+
+
+# Sort the run in place. Large runs are split into chunks that are sorted
+# in the process pool. The sorted chunks are joined and sorted again, which
+# merges them in one pass because list.sort() finds the sorted runs.
+def sort_run(run, reverse=False):
+    workers = SORT_WORKERS
+    if len(run) < max(PARALLEL_SORT_THRESHOLD, 2) or workers < 2 \
+            or parent_process() is not None:
+        run.sort(reverse=reverse)
+        return
+
+    size = -(-len(run) // workers)
+    chunks = [run[i:i + size] for i in range(0, len(run), size)]
+    pool = get_process_pool()
+    sorted_chunks = pool.map(sorted_chunk, chunks, [reverse] * len(chunks))
+    run[:] = chain.from_iterable(sorted_chunks)
+    run.sort(reverse=reverse)
+
+
+# Run in the process pool by sort_run.
+def sorted_chunk(lines, reverse):
+    return sorted(lines, reverse=reverse)
+
+
+# Yield the lines in sorted order. If they do not fit in SORT_MEMORY_SIZE,
+# sorted runs are spilled to temporary files and merged with heapq.merge.
+def sort_lines(lines, reverse=False):
+    memory_size = SORT_MEMORY_SIZE
+    runs = []
+    try:
+        run = []
+        size = 0
+        for line in lines:
+            run.append(line)
+            size += sys.getsizeof(line)
+            if size >= memory_size:
+                sort_run(run, reverse)
+                runs.append(write_run(run))
+                run = []
+                size = 0
+        sort_run(run, reverse)
+        if len(runs) == 0:
+            yield from run
+            return
+        yield from heapq.merge(*(read_run(f) for f in runs), iter(run),
+                               reverse=reverse)
+    finally:
+        for f in runs:
+            f.close()
+
+
+# Write the sorted lines to a temporary file. The lines are pickled, so they
+# are read back exactly, whether or not they end with a newline.
+def write_run(lines):
+    f = tempfile.TemporaryFile()
+    for i in range(0, len(lines), RUN_BATCH_SIZE):
+        pickle.dump(lines[i:i + RUN_BATCH_SIZE], f)
+    f.seek(0)
+    return f
+
+
+def read_run(f):
+    while True:
+        try:
+            batch = pickle.load(f)
+        except EOFError:
+            return
+        yield from batch
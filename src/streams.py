@@ -0,0 +1,26 @@
+# Helpers for the line iterators passed between the calls of a pipe.
+
+
+# Return an iterator over the lines, or None if there are no lines.
+def peek(lines):
+    iterator = iter(lines)
+    for first in iterator:
+        return prepend(first, iterator)
+    return None
+
+
+def prepend(first, iterator):
+    try:
+        yield first
+        yield from iterator
+    finally:
+        close(iterator)
+
+
+# Tell the producer of the lines that no more of them will be read, like
+# SIGPIPE in a UNIX shell. Generators stop at their current yield and
+# release their files; other iterables are left as they are.
+def close(lines):
+    close_lines = getattr(lines, "close", None)
+    if close_lines is not None:
+        close_lines()
@@ -1,16 +1,32 @@
-from application import Application
-
-# Unsafe decorator pattern implemented
-# An instance of this class is made when an unsafe application is used.
-
-
-class UnsafeDecorator(Application):
-    def __init__(self, app):
-        self.app = app
-
-    # Executes the command and prints the error if an error is raised.
-    def exec(self, args, output):
-        try:
-            self.app.exec(args, output)
-        except Exception as e:
-            print(e)
+from application import Application
+
+# Unsafe decorator pattern implemented
+# An instance of this class is made when an unsafe application is used.
+
+
+class UnsafeDecorator(Application):
+    def __init__(self, app):
+        self.app = app
+
+    @property
+    def cpu_bound(self):
+        return self.app.cpu_bound
+
+    @property
+    def splits_stdin(self):
+        return self.app.splits_stdin
+
+    # Executes the command and prints the error if an error is raised.
+    def exec(self, args, output):
+        try:
+            self.app.exec(args, output)
+        except Exception as e:
+            print(e)
+
+    # Yields the output of the application and prints the error if an error
+    # is raised while streaming it.
+    def stream(self, args):
+        try:
+            yield from self.app.stream(args)
+        except Exception as e:
+            print(e)
@@ -0,0 +1,46 @@
+# Buffered output of the shell.
+
+# Number of bytes collected before they are written out.
+FLUSH_SIZE = 1 << 16
+
+
+# Collects the output lines of a command as bytes and writes them to the
+# binary stream whenever flush_size bytes are waiting. It has the append()
+# and extend() methods of the output deque, so a command writes to it while
+# it is still running, and write() so that print() can be redirected to it
+# and keep error messages in order with the output.
+class OutputWriter:
+    def __init__(self, stream, flush_size=FLUSH_SIZE, encoding="utf-8"):
+        self.stream = stream
+        self.flush_size = flush_size
+        self.encoding = encoding
+        self.buffer = bytearray()
+
+    def append(self, line):
+        self.buffer += line.encode(self.encoding)
+        if len(self.buffer) >= self.flush_size:
+            self.flush()
+
+    def extend(self, lines):
+        encoding = self.encoding
+        flush_size = self.flush_size
+        for line in lines:
+            self.buffer += line.encode(encoding)
+            if len(self.buffer) >= flush_size:
+                self.flush()
+
+    def write(self, text):
+        self.append(text)
+        return len(text)
+
+    # Write out the waiting bytes. The buffer is replaced before writing so
+    # that lines appended by another thread meanwhile are not lost.
+    def flush(self):
+        buffer = self.buffer
+        self.buffer = bytearray()
+        if buffer:
+            self.stream.write(buffer)
+        self.stream.flush()
+
+    def isatty(self):
+        return self.stream.isatty()
@@ -1,10 +1,37 @@
+import io
+import itertools
+import re
+import shutil
+import tempfile
+import threading
 import unittest
 
-from src.parse import parse
+from antlr4 import InputStream, CommonTokenStream
+from src.grammar.ShellLexer import ShellLexer
+from src.grammar.ShellParser import ShellParser
+
+from src.parse import parse, plan_cache, set_plan_cache_size, \
+    PLAN_CACHE_SIZE, convert, parse_tree
+from src.fast_parse import fast_convert
 from collections import deque
 from src.converter import Converter
+# The same modules the Converter and Call use.
+from command import Seq, Pipe, Call, PIPELINE_MODES, set_pipeline_mode
+from registry import register, unregister, lookup, check_arguments
+from streams import close
+import pipeline
+from src.writer import OutputWriter
+from src.shell import run
 from src.file_handling import *
+from src import file_handling
 from src.application import *
+# The file cache the applications use.
+from file_handling import file_cache, set_file_cache_size, FILE_CACHE_SIZE, lines_size, open_file
+from application import pattern_cache, set_grep_workers, set_grep_parallel_size, GREP_PARALLEL_SIZE, \
+    set_find_workers, FIND_WORKERS
+import sorting
+import find_index
+from sorting import sort_lines, set_sort_memory_size, SORT_MEMORY_SIZE
 import os
 
 
@@ -147,6 +174,13 @@ class TestHead(unittest.TestCase):
     def test_head_wrong_flag_used_error(self):
         self.assertRaises(ValueError, parse, "head -r 5 test_head.txt", self.out, Converter())
 
+    def test_head_does_not_read_whole_file(self):
+        file_cache.clear()
+        parse("head -n 2 test_head.txt", self.out, Converter())
+        self.assertEqual(list(self.out), self.lines[:2])
+        # Files are only cached once they have been read to the end.
+        self.assertNotIn(os.path.realpath("test_head.txt"), file_cache)
+
 
 class TestTail(unittest.TestCase):
 
@@ -186,6 +220,42 @@ class TestTail(unittest.TestCase):
     def test_tail_wrong_flag_used_error(self):
         self.assertRaises(ValueError, parse, "tail -r 5 test_head.txt", self.out, Converter())
 
+    def test_tail_zero_lines(self):
+        parse("tail -n 0 test_tail.txt", self.out, Converter())
+        parse("cat test_tail.txt | tail -n 0", self.out, Converter())
+        self.assertEqual(list(self.out), [])
+
+    def test_tail_reads_blocks_from_end(self):
+        block_size = file_handling.TAIL_BLOCK_SIZE
+        file_handling.TAIL_BLOCK_SIZE = 7
+        try:
+            for last in ["\u00e9\n", "\u00e9"]:
+                lines = [f"\u00e9{i}\n" for i in range(30)] + [last]
+                make_file("test_tail.txt", lines)
+                for count in [1, 2, 5, 31, 40]:
+                    self.assertEqual(
+                        file_handling.read_last_lines("test_tail.txt", count),
+                        lines[-count:])
+        finally:
+            file_handling.TAIL_BLOCK_SIZE = block_size
+
+    def test_tail_reads_pipe_a_line_at_a_time(self):
+        os.mkfifo("test_tail_fifo")
+        self.addCleanup(os.remove, "test_tail_fifo")
+
+        def write():
+            with open("test_tail_fifo", "w", newline="") as f:
+                for i in range(100000):
+                    f.write(f"\u00e9{i}\n")
+                f.write("a\r\nb")
+        writer = threading.Thread(target=write)
+        writer.start()
+        try:
+            self.assertEqual(file_handling.read_last_lines("test_tail_fifo", 3),
+                             ["\u00e999999\n", "a\n", "b"])
+        finally:
+            writer.join()
+
 
 class TestUniq(unittest.TestCase):
     def setUp(self) -> None:
@@ -219,6 +289,33 @@ class TestUniq(unittest.TestCase):
     def test_uniq_wrong_flag_error(self):
         self.assertRaises(ValueError, parse, "cat test_uniq.txt | uniq -r", self.out, Converter())
 
+    def test_uniq_file_is_read_instead_of_stdin(self):
+        parse("echo x | uniq test_uniq.txt", self.out, Converter())
+        self.assertEqual(list(self.out), ["AAA\n", "bbb\n", "aaa\n", "AAA\n", "BBB\n", "bbb\n"])
+
+    def test_uniq_counts(self):
+        parse("uniq -c test_uniq.txt", self.out, Converter())
+        self.assertEqual(list(self.out), ["      1 AAA\n", "      1 bbb\n", "      1 aaa\n", "      2 AAA\n",
+                                          "      1 BBB\n", "      2 bbb\n"])
+
+    def test_uniq_duplicated_only(self):
+        parse("uniq -d test_uniq.txt", self.out, Converter())
+        self.assertEqual(list(self.out), ["AAA\n", "bbb\n"])
+
+    def test_uniq_counts_duplicated_ignoring_case(self):
+        parse("cat test_uniq.txt | uniq -i -cd", self.out, Converter())
+        self.assertEqual(list(self.out), ["      3 aaa\n", "      3 BBB\n"])
+
+    def test_uniq_empty_input(self):
+        make_file("test_uniq.txt", [])
+        parse("uniq test_uniq.txt", self.out, Converter())
+        self.assertEqual(list(self.out), [])
+
+    def test_uniq_streams_input(self):
+        lines = (f"{i // 2}\n" for i in itertools.count())
+        output = Uniq().stream(["-c", lines])
+        self.assertEqual(list(itertools.islice(output, 3)), ["      2 0\n", "      2 1\n", "      2 2\n"])
+
 
 class TestCut(unittest.TestCase):
     def setUp(self) -> None:
@@ -248,6 +345,54 @@ class TestCut(unittest.TestCase):
     def test_cut_wrong_flag_error(self):
         self.assertRaises(ValueError, parse, "cut -r 1,2-3 test_cut.txt", self.out, Converter())
 
+    def test_cut_multi_digit_indices(self):
+        make_file("test_cut.txt", ["abcdefghijklmnop\n", "short\n"])
+        parse("cut -b 2,10-12,15- test_cut.txt", self.out, Converter())
+        self.assertEqual(["bjklop\n", "h\n"], list(self.out))
+
+    def test_cut_scattered_bytes(self):
+        make_file("test_cut.txt", ["abcdefghij\n", "abc\n"])
+        parse("cut -b 9,1,5,3 test_cut.txt", self.out, Converter())
+        self.assertEqual(["acei\n", "ac\n"], list(self.out))
+
+    def test_cut_counts_bytes_not_characters(self):
+        make_file("test_cut.txt", ["\u00e9t\u00e9\n"])
+        parse("cut -b 1-3 test_cut.txt", self.out, Converter())
+        self.assertEqual(["\u00e9t\n"], list(self.out))
+
+    def test_cut_invalid_byte_list_error(self):
+        for spec in ["0", "3-1", "-", "a-2", "1,,2"]:
+            self.assertRaises(ValueError, parse, f"cut -b {spec} test_cut.txt", self.out, Converter())
+
+    def test_cut_fields(self):
+        make_file("test_cut.txt", ["a,b,c,d\n", "e,f,g,h\n"])
+        parse("cut -d , -f 3,1 test_cut.txt", self.out, Converter())
+        self.assertEqual(["a,c\n", "e,g\n"], list(self.out))
+
+    def test_cut_field_open_interval(self):
+        make_file("test_cut.txt", ["a,b,c,d\n", "e,f\n"])
+        parse("cut -d , -f 2- test_cut.txt", self.out, Converter())
+        self.assertEqual(["b,c,d\n", "f\n"], list(self.out))
+
+    def test_cut_fields_default_to_tab(self):
+        make_file("test_cut.txt", ["a\tb\tc\n"])
+        parse("cut -f 2 test_cut.txt", self.out, Converter())
+        self.assertEqual(["b\n"], list(self.out))
+
+    def test_cut_fields_line_without_delimiter(self):
+        make_file("test_cut.txt", ["a b c\n", "d:e\n", "f:\n"])
+        parse("cut -d : -f 2 test_cut.txt", self.out, Converter())
+        self.assertEqual(["a b c\n", "e\n", "\n"], list(self.out))
+
+    def test_cut_fields_from_stdin(self):
+        parse("echo 'x y z' | cut -f 2-3 -d ' '", self.out, Converter())
+        self.assertEqual(["y z\n"], list(self.out))
+
+    def test_cut_field_options_error(self):
+        for line in ["cut -d ab -f 1 test_cut.txt", "cut -d , -b 1 test_cut.txt",
+                     "cut -f 1 -f 2 test_cut.txt", "cut -d , -f 0 test_cut.txt"]:
+            self.assertRaises(ValueError, parse, line, self.out, Converter())
+
 
 class TestGrep(unittest.TestCase):
     def setUp(self) -> None:
@@ -315,6 +460,72 @@ class TestGrep(unittest.TestCase):
         self.out = remove_colour(self.out)
         self.assertEqual(self.out, ["hello ", "AAA\n", "AA\n", "AAa\n"])
 
+    def test_grep_literal_and_regex_match_the_same(self):
+        grep = Grep()
+        lines = ["AA\n", "bAA\n", "A.A\n", "AAx\n", "\n"]
+        for pattern in ["AA", "A.A", "A\\.A", "b", "AAx\n", "x"]:
+            self.assertEqual(
+                [line for line in lines if grep.matcher(pattern)(line)],
+                [line for line in lines if re.match(pattern, line)])
+
+    def test_grep_whole_file_matches_lines(self):
+        grep = Grep()
+        contents = ["AA\nbAA\nA b\nb\n\nAAx", "A\n\nb A\n", "\u00e9A\nA\u00e9\n",
+                    "A\r\nb\r\n", "a\nq\n", "x\na\n"]
+        patterns = ["AA", "A", "A\\s+b", "[^x]*", "", "A$", "b\n", "A\\Z",
+                    "A.", "(?i)aa", "x*", "a(?=[^z]*q)", "a(?![^z]*q)",
+                    "a(?<=\na)"]
+        for content in contents:
+            with open("test_grep3.txt", "w", newline="") as f:
+                f.write(content)
+            lines = list(iter_file("test_grep3.txt"))
+            for pattern in patterns:
+                self.assertEqual(
+                    list(grep.match_file("test_grep3.txt", pattern,
+                                         grep.matcher(pattern))),
+                    [line for line in lines if re.match(pattern, line)],
+                    (content, pattern))
+
+    def test_grep_small_files_are_searched_in_this_process(self):
+        set_grep_workers(2)
+        try:
+            grep = lookup("grep").application()
+            files = list(grep.match_files(["test_grep1.txt", "test_grep2.txt"], "A", grep.matcher("A")))
+        finally:
+            set_grep_workers(os.cpu_count() or 1)
+        # Lines matched in a worker process come back as a list.
+        self.assertFalse(any(isinstance(lines, list) for _, lines in files))
+
+    def test_grep_files_in_parallel_keeps_order(self):
+        set_grep_workers(2)
+        set_grep_parallel_size(0)
+        try:
+            parse("grep A test_grep1.txt test_grep2.txt test_grep1.txt",
+                  self.out, Converter())
+            self.assertRaises(FileNotFoundError, parse,
+                              "grep A test_grep1.txt test_missing.txt",
+                              deque(), Converter())
+        finally:
+            set_grep_workers(os.cpu_count() or 1)
+            set_grep_parallel_size(GREP_PARALLEL_SIZE)
+        self.out = remove_colour(self.out)
+        self.assertEqual(self.out, [
+            "test_grep1.txt:AA\n", "test_grep1.txt:AAA\n",
+            "test_grep1.txt:AAA\n", "test_grep2.txt:AAA\n",
+            "test_grep2.txt:AA\n", "test_grep2.txt:AAa\n",
+            "test_grep1.txt:AA\n", "test_grep1.txt:AAA\n",
+            "test_grep1.txt:AAA\n"])
+
+    def test_grep_file_ignores_stdin(self):
+        parse("echo AAA | grep A test_grep2.txt", self.out, Converter())
+        self.assertEqual(remove_colour(self.out), ["AAA\n", "AA\n", "AAa\n"])
+
+    def test_grep_pattern_is_compiled_once(self):
+        pattern_cache.clear()
+        parse("cat test_grep2.txt | grep 'A.'; cat test_grep1.txt | grep 'A.'",
+              self.out, Converter())
+        self.assertEqual(pattern_cache.info()[:2], (1, 1))
+
 
 class TestSort(unittest.TestCase):
     def setUp(self) -> None:
@@ -342,6 +553,35 @@ class TestSort(unittest.TestCase):
         self.assertEqual(['A\n', 'Is\n', 'Test\n', 'This\n', 'hello '], list(self.out))
 
 
+    def test_sort_in_parallel(self):
+        lines = [f"{i * 7919 % 1000}\n" for i in range(1000)]
+        self.assertEqual(sorting.SORT_WORKERS, 1)
+        threshold = sorting.PARALLEL_SORT_THRESHOLD
+        sorting.PARALLEL_SORT_THRESHOLD = 10
+        sorting.set_sort_workers(3)
+        try:
+            for reverse in [False, True]:
+                self.assertEqual(list(sort_lines(iter(lines), reverse)),
+                                 sorted(lines, reverse=reverse))
+        finally:
+            sorting.PARALLEL_SORT_THRESHOLD = threshold
+            sorting.set_sort_workers(1)
+
+    def test_sort_spills_runs_to_files(self):
+        lines = [f"{i * 7919 % 1000}" + ("\n" if i % 3 else "") for i in range(1000)]
+        set_sort_memory_size(2000)
+        try:
+            for reverse in [False, True]:
+                self.assertEqual(list(sort_lines(iter(lines), reverse)),
+                                 sorted(lines, reverse=reverse))
+            make_file("sort_test.txt", [f"{i % 97}\n" for i in range(1000)])
+            parse("sort -r sort_test.txt", self.out, Converter())
+        finally:
+            set_sort_memory_size(SORT_MEMORY_SIZE)
+        self.assertEqual(list(self.out),
+                         sorted([f"{i % 97}\n" for i in range(1000)],
+                                reverse=True))
+
 class TestFind(unittest.TestCase):
     def setUp(self) -> None:
         make_file("test_find.txt")
@@ -377,6 +617,67 @@ class TestFind(unittest.TestCase):
     def test_find_with_wrong_flag_error(self):
         self.assertRaises(ValueError, parse, "find -n test_shell.py", self.out, Converter())
 
+    def make_tree(self):
+        for directory in ["test_find_dir/a/b", "test_find_dir/c"]:
+            os.makedirs(directory, exist_ok=True)
+        for file in ["test_find_dir/x.py", "test_find_dir/a/y.py", "test_find_dir/a/b/z.py",
+                     "test_find_dir/c/w.txt"]:
+            make_file(file)
+        self.addCleanup(shutil.rmtree, "test_find_dir")
+
+    def test_find_maxdepth(self):
+        self.make_tree()
+        parse("find test_find_dir -maxdepth 2 -name '*.py'", self.out, Converter())
+        self.assertEqual(sorted(self.out), ["test_find_dir/a/y.py\n", "test_find_dir/x.py\n"])
+
+    def test_find_maxdepth_zero(self):
+        self.make_tree()
+        parse("find test_find_dir -maxdepth 0", self.out, Converter())
+        self.assertEqual(list(self.out), [])
+
+    def test_find_type_d(self):
+        self.make_tree()
+        parse("find test_find_dir -type d", self.out, Converter())
+        self.assertEqual(sorted(self.out), sorted(["test_find_dir\n", "test_find_dir/a\n", "test_find_dir/a/b\n",
+                                                   "test_find_dir/c\n"]))
+
+    def test_find_type_f(self):
+        self.make_tree()
+        parse("find test_find_dir -name '*.txt' -type f", self.out, Converter())
+        self.assertEqual(list(self.out), ["test_find_dir/c/w.txt\n"])
+
+    def test_find_order_does_not_depend_on_workers(self):
+        self.make_tree()
+        outputs = []
+        for workers in [1, 8]:
+            set_find_workers(workers)
+            out = deque()
+            parse("find test_find_dir", out, Converter())
+            outputs.append(list(out))
+        set_find_workers(FIND_WORKERS)
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(sorted(outputs[0]), sorted(os.path.join(root, name) + "\n"
+                                                    for root, _, files in os.walk("test_find_dir")
+                                                    for name in files))
+
+    def test_find_ignores_stdin(self):
+        self.make_tree()
+        for cmdline in ["echo a | find test_find_dir -name '*.txt'", "echo a | _find test_find_dir -name '*.txt'"]:
+            out = deque()
+            parse(cmdline, out, Converter())
+            self.assertEqual(list(out), ["test_find_dir/c/w.txt\n"])
+
+    def test_find_empty_path(self):
+        parse('find ""', self.out, Converter())
+        self.assertEqual(list(self.out), [])
+        validate = lookup("find").validator
+        validate(["", "-name", "x", iter(["a\n"])])
+        self.assertRaises(ValueError, validate, ["-name", "", ""])
+
+    def test_find_expression_errors(self):
+        for line in ["find -maxdepth x", "find -type l", "find . -maxdepth", "find -name a b -type f"]:
+            self.assertRaises(ValueError, parse, line, self.out, Converter())
+
 
 class TestCd(unittest.TestCase):
     def test_cd(self):
@@ -495,6 +796,584 @@ class TestWc(unittest.TestCase):
         parse("wc < test_wc2.txt", self.out, Converter())
         self.assertEqual(list(self.out), ["5:5:20"])
 
+    def test_wc_flags(self):
+        parse("wc -l test_wc.txt; wc -w -c test_wc.txt; wc -cl < test_wc.txt",
+              self.out, Converter())
+        self.assertEqual(list(self.out),
+                         ["test_wc.txt:6", "test_wc.txt:9:41", "6:41"])
+
+    def test_wc_wrong_flag(self):
+        self.assertRaises(ValueError, parse, "wc -m test_wc.txt", self.out,
+                          Converter())
+
+    def test_wc_counts_bytes_not_characters(self):
+        make_file("test_wc.txt", ["h\u00e9llo w\u00f6rld\n"])
+        parse("wc test_wc.txt; cat test_wc.txt | wc", self.out, Converter())
+        self.assertEqual(list(self.out), ["test_wc.txt:1:2:14", "1:2:14"])
+
+    def test_wc_words_across_chunks(self):
+        wc = Wc()
+        for size in range(1, 8):
+            chunks = [b"abc def\n ghi\njk  \n"[i:i + size]
+                      for i in range(0, 18, size)]
+            self.assertEqual(wc.count_chunks(chunks, True), (3, 4, 18))
+
+class TestPlanCache(unittest.TestCase):
+    def setUp(self) -> None:
+        plan_cache.clear()
+        make_file("test_plan.txt", ["plan\n"])
+        self.out = deque()
+
+    def tearDown(self):
+        set_plan_cache_size(PLAN_CACHE_SIZE)
+
+    def test_repeated_line_is_a_cache_hit(self):
+        parse("echo foo", self.out, Converter())
+        parse("echo foo", self.out, Converter())
+        self.assertEqual(list(self.out), ["foo ", "foo "])
+        self.assertEqual(plan_cache.info()[:2], (1, 1))
+
+    def test_cached_plan_is_not_modified_by_eval(self):
+        parse("cat < test_plan.txt", self.out, Converter())
+        parse("cat < test_plan.txt", self.out, Converter())
+        self.assertEqual(list(self.out), ["plan\n", "plan\n"])
+
+    def test_least_recently_used_line_is_evicted(self):
+        set_plan_cache_size(2)
+        for line in ["echo a", "echo b", "echo a", "echo c"]:
+            parse(line, self.out, Converter())
+        self.assertEqual(plan_cache.evictions, 1)
+        self.assertIn("echo a", plan_cache)
+        self.assertNotIn("echo b", plan_cache)
+
+    def test_backquoted_line_is_not_cached(self):
+        parse("echo `echo foo`", self.out, Converter())
+        self.assertEqual(len(plan_cache), 0)
+
+
+class TestFastParse(unittest.TestCase):
+    # Lines in the subset handled by the fast path.
+    simple = ["echo foo", "echo hello world", "cat a b > c", "<f cat",
+              "cat < f > g", "echo a b >>f", "echo >f a", "sort -r f | uniq",
+              "cat f|grep a|head -n 1", "cat f | sort > g",
+              "echo a > f | cat", "echo a; echo b; echo c",
+              "echo x > out; cat out", "\techo\ta  b ", "_cat f; echo *.py",
+              "echo a;echo b|cat", "foo bar", "echo cat | cat"]
+
+    # Lines left to the ANTLR parser.
+    fallback = ["echo 'a b'", 'echo "a"', "echo `pwd`", "echo a;",
+                "echo a>f", "cat << f", "< f", "", "echo a\n"]
+
+    def test_fast_path_matches_parser(self):
+        for line in self.simple:
+            fast = fast_convert(line)
+            self.assertIsNotNone(fast, line)
+            self.assertEqual(fast, convert(line, Converter()), line)
+
+    def test_unsupported_lines_fall_back(self):
+        for line in self.fallback:
+            self.assertIsNone(fast_convert(line), line)
+
+    def test_fast_path_output(self):
+        out = deque()
+        parse("echo a b | cat", out, Converter())
+        parse("echo c; echo d", out, Converter())
+        self.assertEqual(list(out), ["a ", "b ", "c ", "d "])
+
+
+class TestParseTree(unittest.TestCase):
+    def test_two_stage_tree_matches_ll_tree(self):
+        line = "echo 'a b' | cat; echo \"c `echo d`\" > f"
+        parser = ShellParser(CommonTokenStream(ShellLexer(InputStream(line))))
+        expected = parser.command().toStringTree(recog=parser)
+        self.assertEqual(parse_tree(line).toStringTree(recog=parser), expected)
+
+    def test_syntax_error_falls_back_to_ll_recovery(self):
+        out = deque()
+        parse("echo 'a';", out, Converter())
+        self.assertEqual(list(out), ["a "])
+
+
+class TestCommandTree(unittest.TestCase):
+    def setUp(self) -> None:
+        self.out = deque()
+
+    def test_converter_builds_typed_commands(self):
+        command = convert("echo 'a' | cat; < f cat x > g", Converter())
+        self.assertEqual(command, Seq([
+            Pipe([Call("echo", ["'a'"]), Call("cat")]),
+            Call("cat", ["x"], [("<", ["f"]), (">", ["g"])])]))
+
+    def test_long_sequence_is_flattened(self):
+        command = convert("; ".join(["echo 'a'"] * 2000), Converter())
+        self.assertEqual(len(command.commands), 2000)
+
+    def test_pipe_within_sequence(self):
+        parse("echo 'a' | cat; echo b", self.out, Converter())
+        self.assertEqual(list(self.out), ["a ", "b "])
+
+    def test_output_redirection_in_sequence_only_writes_its_call(self):
+        parse("echo a; echo b > test_tree.txt", self.out, Converter())
+        self.assertEqual(list(self.out), ["a "])
+        self.assertEqual(open_file("test_tree.txt"), ["b \n"])
+
+    def test_output_redirection_to_an_input_file_keeps_its_lines(self):
+        lines = ["b\n", "c a\n", "a\n"]
+        for cmdline in ["sort {0}", "cat {0}", "grep a {0}", "sort < {0}", "cat {0} {0}"]:
+            make_file("test_tree.txt", lines)
+            parse(cmdline.format("test_tree.txt") + " > test_tree2.txt", deque(), Converter())
+            parse(cmdline.format("test_tree.txt") + " > test_tree.txt", deque(), Converter())
+            self.assertEqual(open_file("test_tree.txt"), open_file("test_tree2.txt"), cmdline)
+            self.assertNotEqual(open_file("test_tree.txt"), [], cmdline)
+
+    def test_appending_to_an_input_file(self):
+        make_file("test_tree.txt", ["a\n"])
+        parse("cat test_tree.txt >> test_tree.txt", deque(), Converter())
+        self.assertEqual(open_file("test_tree.txt"), ["a\n", "a\n", "\n"])
+
+
+class Reverse(Application):
+    def exec(self, args, output):
+        output.append(" ".join(reversed(args)))
+
+
+class Fail(Application):
+    def exec(self, args, output):
+        raise ValueError("failed")
+
+
+class TestRegistry(unittest.TestCase):
+    def setUp(self) -> None:
+        register("rev", Reverse, check_arguments([0], False))
+        register("fail", Fail)
+        self.out = deque()
+
+    def tearDown(self):
+        unregister("rev")
+        unregister("fail")
+
+    def test_registered_application_is_called(self):
+        parse("rev a b c", self.out, Converter())
+        self.assertEqual(list(self.out), ["c b a"])
+
+    def test_registered_validator_is_used(self):
+        self.assertRaises(ValueError, parse, "rev", self.out, Converter())
+
+    def test_unsafe_variant_is_registered(self):
+        parse("_fail; echo ok", self.out, Converter())
+        self.assertEqual(list(self.out), ["ok "])
+        self.assertFalse(lookup("_fail").safe)
+
+    def test_unregistered_application_error(self):
+        unregister("rev")
+        self.assertRaises(ValueError, lookup, "rev")
+
+
+class Yes(StreamingApplication):
+    def stream(self, args):
+        while True:
+            yield "y\n"
+
+
+class TestStreaming(unittest.TestCase):
+    def setUp(self) -> None:
+        register("yes", Yes)
+        make_file("test_stream.txt", ["apple\n", "banana\n", "avocado\n"])
+        self.out = deque()
+
+    def tearDown(self):
+        unregister("yes")
+        set_pipeline_mode("stream")
+
+    def test_stages_are_lazy(self):
+        parse("yes | cat | head -n 3", self.out, Converter())
+        self.assertEqual(list(self.out), ["y\n", "y\n", "y\n"])
+
+    def test_modes_give_the_same_output(self):
+        outputs = []
+        for mode in PIPELINE_MODES:
+            set_pipeline_mode(mode)
+            out = deque()
+            parse("cat test_stream.txt | grep a | sort -r | cut -b 1-2", out,
+                  Converter())
+            outputs.append(list(out))
+        self.assertEqual(outputs[0], ["av\n", "ap\n"])
+        self.assertTrue(all(out == outputs[0] for out in outputs))
+
+    def test_unknown_mode_error(self):
+        self.assertRaises(ValueError, set_pipeline_mode, "parallel")
+
+    def test_stream_of_non_streaming_application(self):
+        lines = Sort().stream(["-r", iter(["a\n", "b\n"])])
+        self.assertEqual(list(lines), ["b\n", "a\n"])
+
+
+class Count(StreamingApplication):
+    produced = 0
+    closed = False
+
+    def stream(self, args):
+        try:
+            while True:
+                Count.produced += 1
+                yield f"{Count.produced}\n"
+        finally:
+            Count.closed = True
+
+
+class TestEarlyTermination(unittest.TestCase):
+    def setUp(self) -> None:
+        register("count", Count)
+        Count.produced = 0
+        Count.closed = False
+        self.out = deque()
+
+    def tearDown(self):
+        unregister("count")
+
+    def test_head_stops_upstream_producers(self):
+        parse("count | grep 2 | cat | head -n 1", self.out, Converter())
+        self.assertEqual(list(self.out), ["2\n"])
+        self.assertEqual(Count.produced, 2)
+        self.assertTrue(Count.closed)
+
+    def test_producers_are_closed_when_a_call_fails(self):
+        self.assertRaises(ValueError, parse, "count | cut -x 1", self.out,
+                          Converter())
+        self.assertTrue(Count.closed)
+
+    def test_close_of_lines_without_producer(self):
+        close(["a\n"])
+
+
+class TestThreadedPipe(unittest.TestCase):
+    def setUp(self) -> None:
+        register("count", Count)
+        Count.produced = 0
+        Count.closed = False
+        set_pipeline_mode("threaded")
+        make_file("test_threaded.txt", [f"{i}\n" for i in range(1000)])
+        self.out = deque()
+
+    def tearDown(self):
+        unregister("count")
+        set_pipeline_mode("stream")
+
+    def test_output_order_is_kept(self):
+        parse("cat test_threaded.txt | grep 1 | cat", self.out, Converter())
+        self.assertEqual(list(self.out),
+                         [f"{i}\n" for i in range(1000) if str(i)[0] == "1"])
+
+    def test_exception_is_raised_in_caller(self):
+        self.assertRaises(FileNotFoundError, parse,
+                          "cat test_missing.txt | sort | cat", self.out,
+                          Converter())
+
+    def test_consumer_stops_producers(self):
+        parse("count | cat | head -n 2", self.out, Converter())
+        self.assertEqual(list(self.out), ["1\n", "2\n"])
+        self.assertTrue(Count.closed)
+
+    def test_output_redirection_in_worker(self):
+        parse("cat test_threaded.txt | head -n 2 > test_threaded_out.txt",
+              self.out, Converter())
+        self.assertEqual(list(self.out), [])
+        self.assertEqual(open_file("test_threaded_out.txt"),
+                         ["0\n", "\n", "1\n", "\n"])
+
+
+class TestProcessPipe(unittest.TestCase):
+    def setUp(self) -> None:
+        set_pipeline_mode("process")
+        make_file("test_process.txt", [f"{i}\n" for i in range(1000)])
+        self.out = deque()
+
+    def tearDown(self):
+        set_pipeline_mode("stream")
+
+    def test_cpu_bound_applications(self):
+        self.assertTrue(lookup("grep").application.cpu_bound)
+        self.assertTrue(lookup("sort").application.cpu_bound)
+        self.assertTrue(lookup("wc").application.cpu_bound)
+        self.assertFalse(lookup("cat").application.cpu_bound)
+
+    def test_split_stdin_keeps_order(self):
+        pipeline.PROCESS_BATCH_SIZE = 10
+        try:
+            parse("cat test_process.txt | grep 1 | cat", self.out,
+                  Converter())
+        finally:
+            pipeline.PROCESS_BATCH_SIZE = 4096
+        self.assertEqual(list(self.out),
+                         [f"{i}\n" for i in range(1000) if str(i)[0] == "1"])
+
+    def test_whole_stdin(self):
+        parse("cat test_process.txt | sort -r | head -n 2", self.out,
+              Converter())
+        self.assertEqual(list(self.out), ["999\n", "998\n"])
+
+    def test_files_read_in_worker_directory(self):
+        parse("sort -r test_process.txt | head -n 1", self.out, Converter())
+        self.assertEqual(list(self.out), ["999\n"])
+
+    def test_worker_exception_is_raised_in_caller(self):
+        self.assertRaises(ValueError, parse, "echo a | sort -x",
+                          self.out, Converter())
+
+    def test_unsafe_error_is_printed_by_the_shell(self):
+        buffer = io.BytesIO()
+        run("echo a | _sort -x; echo done", OutputWriter(buffer))
+        self.assertEqual(buffer.getvalue(), b"Wrong flag\ndone ")
+
+    def test_pool_is_reused(self):
+        parse("echo a | sort", self.out, Converter())
+        pool = pipeline.get_process_pool()
+        parse("echo b | sort", self.out, Converter())
+        self.assertIs(pipeline.get_process_pool(), pool)
+        self.assertEqual(list(self.out), ["a ", "b "])
+
+
+# Yields lines, recording how many bytes had been written to the stream
+# before each one.
+class Probe(StreamingApplication):
+    output = None
+    stream_sizes = []
+
+    def stream(self, args):
+        for i in range(10):
+            Probe.stream_sizes.append(len(Probe.output.getvalue()))
+            yield f"{i}\n"
+
+
+class TestOutputWriter(unittest.TestCase):
+    def setUp(self) -> None:
+        self.stream = io.BytesIO()
+
+    def test_flushes_at_flush_size(self):
+        writer = OutputWriter(self.stream, flush_size=8)
+        writer.append("abc\n")
+        self.assertEqual(self.stream.getvalue(), b"")
+        writer.extend(["defg\n", "h\n"])
+        self.assertEqual(self.stream.getvalue(), b"abc\ndefg\n")
+        writer.flush()
+        self.assertEqual(self.stream.getvalue(), b"abc\ndefg\nh\n")
+
+    def test_writes_while_command_runs(self):
+        register("probe", Probe)
+        Probe.output = self.stream
+        Probe.stream_sizes = []
+        try:
+            writer = OutputWriter(self.stream, flush_size=4)
+            parse("probe", writer, Converter())
+        finally:
+            unregister("probe")
+        self.assertEqual(Probe.stream_sizes[0], 0)
+        self.assertEqual(Probe.stream_sizes[-1], 16)
+
+    def test_run_keeps_printed_errors_in_order(self):
+        run("echo a; _cat test_missing.txt; echo b", OutputWriter(self.stream))
+        self.assertEqual(self.stream.getvalue().decode(),
+                         "a [Errno 2] No such file or directory: "
+                         "'test_missing.txt'\nb ")
+
+    def test_encodes_unicode(self):
+        writer = OutputWriter(self.stream)
+        writer.write("\u00e9\n")
+        writer.flush()
+        self.assertEqual(self.stream.getvalue(), "\u00e9\n".encode())
+
+
+class TestLineView(unittest.TestCase):
+    def setUp(self) -> None:
+        with open("test_lines.txt", "wb") as f:
+            f.write("a\n\u00e9b\r\n\n\fc".encode())
+
+    def test_lines(self):
+        view = file_handling.LineView("test_lines.txt")
+        self.assertEqual(list(view), ["a\n", "\u00e9b\n", "\n", "\fc"])
+        self.assertEqual(len(view), 4)
+        self.assertEqual(view[1], "\u00e9b\n")
+        self.assertEqual(view[-1], "\fc")
+        self.assertEqual(view[1:3], ["\u00e9b\n", "\n"])
+        self.assertRaises(IndexError, view.__getitem__, 4)
+
+    def test_index_is_lazy(self):
+        make_file("test_lines.txt", [f"{i}\n" for i in range(1000)])
+        view = file_handling.LineView("test_lines.txt")
+        self.assertEqual(view[2], "2\n")
+        self.assertEqual(len(view.starts), 4)
+        self.assertEqual(len(view), 1000)
+        self.assertFalse(view.complete)
+
+    def test_iterates_in_blocks(self):
+        lines = ["\u00e9" * (i % 5) + f"{i}\n" for i in range(100)]
+        make_file("test_lines.txt", lines)
+        block_sizes = file_handling.FIRST_BLOCK_SIZE, file_handling.BLOCK_SIZE
+        file_handling.FIRST_BLOCK_SIZE, file_handling.BLOCK_SIZE = 3, 20
+        try:
+            self.assertEqual(list(file_handling.LineView("test_lines.txt")), lines)
+        finally:
+            file_handling.FIRST_BLOCK_SIZE, file_handling.BLOCK_SIZE = \
+                block_sizes
+
+    def test_empty_file(self):
+        make_file("test_lines.txt")
+        view = file_handling.LineView("test_lines.txt")
+        self.assertEqual(len(view), 0)
+        self.assertEqual(list(view), [])
+
+    def test_overwriting_detaches_view(self):
+        view = file_handling.LineView("test_lines.txt")
+        make_file("test_lines.txt", ["x\n"])
+        self.assertEqual(view, ["a\n", "\u00e9b\n", "\n", "\fc"])
+        self.assertEqual(file_handling.LineView("test_lines.txt"), ["x\n"])
+
+    def test_overwriting_while_iterating(self):
+        lines = [f"line {i}\n" for i in range(20000)]
+        make_file("test_lines.txt", lines)
+        view = file_handling.LineView("test_lines.txt")
+        iterator = iter(view)
+        first = next(iterator)
+        make_file("test_lines.txt", ["x\n"])
+        self.assertEqual([first] + list(iterator), lines)
+
+    def test_pipe_overwriting_its_input(self):
+        lines = [f"{i:05}\n" for i in range(20000)]
+        make_file("test_lines.txt", reversed(lines))
+        parse("cat test_lines.txt | sort > test_lines.txt", deque(), Converter())
+        with open("test_lines.txt") as f:
+            self.assertEqual(f.read(), "".join(line + "\n" for line in lines))
+
+
+class TestFileCache(unittest.TestCase):
+    def setUp(self) -> None:
+        set_file_cache_size(FILE_CACHE_SIZE)
+        file_cache.clear()
+        parse("echo a > test_cached.txt", deque(), Converter())
+        self.path = os.path.realpath("test_cached.txt")
+        self.out = deque()
+
+    def tearDown(self):
+        set_file_cache_size(FILE_CACHE_SIZE)
+        file_cache.clear()
+
+    def test_repeated_reads_hit_cache(self):
+        parse("cat test_cached.txt; sort test_cached.txt; "
+              "tail test_cached.txt", self.out, Converter())
+        self.assertEqual(list(self.out), ["a \n", "a \n", "a \n"])
+        self.assertEqual(file_cache.info().hits, 2)
+
+    def test_partial_read_is_not_cached(self):
+        lines = iter_file("test_cached.txt")
+        next(lines)
+        lines.close()
+        self.assertNotIn(self.path, file_cache)
+
+    def test_changed_file_is_read_again(self):
+        open_file("test_cached.txt")
+        with open("test_cached.txt", "w") as f:
+            f.write("changed\n")
+        self.assertEqual(open_file("test_cached.txt"), ["changed\n"])
+
+    def test_writes_invalidate(self):
+        for cmdline in ["echo b >> test_cached.txt",
+                        "echo c > test_cached.txt",
+                        "rm test_cached.txt"]:
+            open_file("test_cached.txt")
+            self.assertIn(self.path, file_cache)
+            parse(cmdline, self.out, Converter())
+            self.assertNotIn(self.path, file_cache)
+
+    def test_evicts_by_memory_size(self):
+        make_file("test_cached2.txt", ["bb\n"])
+        size = lines_size(("a \n",)) + lines_size(("bb\n",))
+        set_file_cache_size(size)
+        open_file("test_cached.txt")
+        open_file("test_cached2.txt")
+        self.assertEqual(file_cache.info().currsize, size)
+        parse("echo cc >> test_cached2.txt", self.out, Converter())
+        open_file("test_cached2.txt")
+        self.assertNotIn(self.path, file_cache)
+        self.assertEqual(file_cache.info().currsize, lines_size(("bb\n", "cc \n")))
+
+    def test_weight_counts_line_objects(self):
+        make_file("test_cached2.txt", ["x\n"] * 1000)
+        open_file("test_cached2.txt")
+        cached = file_cache.get(os.path.realpath("test_cached2.txt"))
+        self.assertGreater(cached.size, 20 * 2000)
+
+    def test_large_file_is_not_cached(self):
+        set_file_cache_size(lines_size(("a \n",)) - 1)
+        self.assertEqual(open_file("test_cached.txt"), ["a \n"])
+        self.assertEqual(len(file_cache), 0)
+
+
+class TestFindIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self.index_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.index_directory)
+        directory = find_index.INDEX_DIRECTORY
+        find_index.set_index_directory(self.index_directory)
+        self.addCleanup(find_index.set_index_directory, directory)
+        for directory in ["test_index_dir/a/b", "test_index_dir/c"]:
+            os.makedirs(directory, exist_ok=True)
+        for file in ["test_index_dir/x.py", "test_index_dir/a/y.py", "test_index_dir/a/b/z.py",
+                     "test_index_dir/c/w.txt"]:
+            make_file(file)
+        self.addCleanup(shutil.rmtree, "test_index_dir")
+
+    def find(self, line):
+        out = deque()
+        parse(line, out, Converter())
+        return sorted(out)
+
+    # Set the mtimes of the directories back, so that the index trusts them.
+    def age_directories(self):
+        for root, dirs, _ in os.walk("test_index_dir"):
+            for directory in [root] + [os.path.join(root, d) for d in dirs]:
+                os.utime(directory, (1, 1))
+
+    def test_index_answers_like_walk(self):
+        queries = ["find test_index_dir", "find test_index_dir -name '*.py'", "find test_index_dir -type d",
+                   "find test_index_dir -maxdepth 2 -type f"]
+        walked = [self.find(line) for line in queries]
+        parse("index test_index_dir", deque(), Converter())
+        self.assertIsNotNone(find_index.load_index("test_index_dir"))
+        self.assertEqual([self.find(line) for line in queries], walked)
+
+    def test_index_serves_unchanged_directories(self):
+        self.age_directories()
+        parse("index test_index_dir", deque(), Converter())
+        # A file added without changing the mtime is not seen.
+        make_file("test_index_dir/a/b/new.py")
+        os.utime("test_index_dir/a/b", (1, 1))
+        self.assertNotIn("test_index_dir/a/b/new.py\n", self.find("find test_index_dir -name '*.py'"))
+
+    def test_index_rescans_changed_directories(self):
+        self.age_directories()
+        parse("index test_index_dir", deque(), Converter())
+        make_file("test_index_dir/a/b/new.py")
+        shutil.rmtree("test_index_dir/c")
+        self.assertEqual(self.find("find test_index_dir -name '*'"),
+                         sorted(["test_index_dir/x.py\n", "test_index_dir/a/y.py\n", "test_index_dir/a/b/z.py\n",
+                                 "test_index_dir/a/b/new.py\n"]))
+        index = find_index.load_index("test_index_dir")
+        self.assertNotIn("c", index.directories)
+
+    def test_index_defaults_to_current_directory(self):
+        os.chdir("test_index_dir")
+        try:
+            parse("index", deque(), Converter())
+        finally:
+            os.chdir("..")
+        self.assertIsNotNone(find_index.load_index("test_index_dir"))
+        self.assertEqual(self.find("find test_index_dir -name '*.py'"),
+                         sorted(["test_index_dir/x.py\n", "test_index_dir/a/y.py\n", "test_index_dir/a/b/z.py\n"]))
+
+    def test_index_of_file_error(self):
+        self.assertRaises(ValueError, parse, "index test_index_dir/x.py", deque(), Converter())
+
+
 #auxillary function used to remove the cyan colour from grep's output allowing the tests to pass
 def remove_colour(output):
     list = [i.replace(Fore.LIGHTCYAN_EX, '') for i in output]